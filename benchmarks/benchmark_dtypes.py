@@ -0,0 +1,136 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import pandas as pd
+import table_io
+from utils import get_data_dir, get_project_root
+from metrics import run_measured
+from benchmark_pipeline import SUPPORT_FILES
+
+# Stages benchmarked, by name: (module, function)
+STAGES = {
+    "combine_transformed": ("combine_transformed", "combine_transformed_files"),
+    "build_fact_and_dimensions": ("build_fact_and_dimensions", "main"),
+}
+
+# Dtypes of the tables before dictionary encoding and small integers
+PLAIN_DTYPES = {"category": "string", "Int16": "Int64", "Int32": "Int64"}
+
+def use_plain_dtypes():
+    """Switch the table schemas of this process to plain strings and 64 bit integers"""
+    for table, schema in table_io.TABLE_SCHEMAS.items():
+        table_io.TABLE_SCHEMAS[table] = {col: PLAIN_DTYPES.get(dtype, dtype) for col, dtype in schema.items()}
+
+def rewrite_transformed(data_dir):
+    """Rewrite the transformed tables of a data directory with the current schemas"""
+    for path in sorted((data_dir / "transformed").glob("transformed_*.parquet")):
+        table_io.write_table(pd.read_parquet(path), path, "transformed", export_csv=False)
+
+def run_child(stage, plain):
+    """Run a stage in this process, as the child of run_stage"""
+    if plain:
+        use_plain_dtypes()
+    module, function = STAGES[stage]
+    getattr(__import__(module), function)()
+
+def run_stage(stage, data_dir, plain):
+    """Run a stage in its own process and return its wall time and peak RSS"""
+    command = [sys.executable, __file__, "--child", stage] + (["--plain"] if plain else [])
+    returncode, usage = run_measured(command, env=dict(os.environ, PIPELINE_DATA_DIR=str(data_dir)),
+                                     cwd=get_project_root() / "scripts", stdout=subprocess.DEVNULL)
+    if returncode != 0:
+        raise RuntimeError(f"{stage} failed with exit code {returncode}")
+    return usage
+
+def run_script(args, data_dir):
+    """Run a Python script of the project in a child process"""
+    subprocess.run([sys.executable, *args], env=dict(os.environ, PIPELINE_DATA_DIR=str(data_dir)),
+                   cwd=get_project_root() / "scripts", stdout=subprocess.DEVNULL, check=True)
+
+def table_memory_mb(path, plain):
+    """In-memory size of a Parquet table read with the plain or the encoded schema"""
+    df = pd.read_parquet(path)
+    if plain:
+        df = df.astype({col: PLAIN_DTYPES.get(str(dtype), dtype) for col, dtype in df.dtypes.items()})
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+def main(rows=200_000, years=(2020, 2021, 2022)):
+    # The peak RSS of a child starts at the peak RSS of the process that
+    # started it, so this process never loads the data before the stages
+    # are measured: the exports are generated, transformed and rewritten in
+    # child processes, and the tables only read at the end
+    encoded_dir = Path(tempfile.mkdtemp(prefix="scopus_dtypes_"))
+    plain_dir = Path(tempfile.mkdtemp(prefix="scopus_dtypes_plain_"))
+
+    try:
+        for support_file in SUPPORT_FILES:
+            (encoded_dir / support_file).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(get_project_root() / "data" / support_file, encoded_dir / support_file)
+
+        generator = Path(__file__).resolve().parent / "generate_scopus_export.py"
+        run_script([str(generator), "--rows", str(rows), "--years", *map(str, years)], encoded_dir)
+        print("Running etl...")
+        run_script(["etl.py", "--force"], encoded_dir)
+
+        # Same transformed tables, written as they were before dictionary encoding
+        shutil.rmtree(plain_dir)
+        shutil.copytree(encoded_dir, plain_dir)
+        run_script([__file__, "--rewrite"], plain_dir)
+
+        labels = (("plain", plain_dir, True), ("encoded", encoded_dir, False))
+        results = {}
+        for label, data_dir, plain in labels:
+            for stage in STAGES:
+                print(f"Running {stage} with {label} dtypes...")
+                results[(label, stage)] = run_stage(stage, data_dir, plain)
+        for label, data_dir, plain in labels:
+            combined = data_dir / "final/combined_publications.parquet"
+            results[(label, "combined_publications")] = table_memory_mb(combined, plain)
+
+        outputs_match = all(
+            pd.read_parquet(plain_dir / table).astype(str).equals(pd.read_parquet(encoded_dir / table).astype(str))
+            for table in ("final/combined_publications.parquet", "fact/publications_fact.parquet",
+                          "fact/authorships.parquet")
+        )
+    finally:
+        shutil.rmtree(encoded_dir, ignore_errors=True)
+        shutil.rmtree(plain_dir, ignore_errors=True)
+
+    print(f"\n{'Stage':28}{'plain MB':>12}{'encoded MB':>12}{'plain (s)':>12}{'encoded (s)':>12}")
+    for stage in STAGES:
+        plain, encoded = results[("plain", stage)], results[("encoded", stage)]
+        print(f"{stage:28}{plain['peak_rss_mb']:>12.1f}{encoded['peak_rss_mb']:>12.1f}"
+              f"{plain['wall_s']:>12.2f}{encoded['wall_s']:>12.2f}")
+    print(f"{'combined_publications':28}{results[('plain', 'combined_publications')]:>12.1f}"
+          f"{results[('encoded', 'combined_publications')]:>12.1f}   (in-memory table size)")
+
+    if not outputs_match:
+        print("The plain and encoded runs produced different tables!")
+        sys.exit(1)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the peak memory of combine and build with plain and encoded dtypes")
+    parser.add_argument("--rows", type=int, default=200_000, help="Number of synthetic publications")
+    parser.add_argument("--years", type=int, nargs="+", default=[2020, 2021, 2022], help="One export file per year")
+    parser.add_argument("--child", choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument("--plain", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rewrite", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.child:
+        run_child(args.child, args.plain)
+    elif args.rewrite:
+        use_plain_dtypes()
+        rewrite_transformed(get_data_dir())
+    else:
+        main(args.rows, args.years)
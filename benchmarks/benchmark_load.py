@@ -0,0 +1,85 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the scripts directory and the project root to the Python path
+project_dir = Path(__file__).resolve().parent.parent
+sys.path.extend([str(project_dir / "scripts"), str(project_dir)])
+
+import pandas as pd
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.ext.declarative import declarative_base
+from utils import get_project_root
+from build_fact_and_dimensions import build_fact_table
+from table_io import apply_schema
+from load_to_warehouse import load_to_warehouse
+from models.database import DatabaseConnection
+from models.schema import Publication
+
+BENCHMARK_TABLE = "benchmark_publications"
+
+def make_benchmark_model():
+    """Map a copy of the publications model, without its foreign keys, to a scratch table"""
+    attributes = {"__tablename__": BENCHMARK_TABLE}
+    for prop in inspect(Publication).column_attrs:
+        column = prop.columns[0]
+        attributes[prop.key] = Column(column.name, column.type, key=column.key, primary_key=column.primary_key)
+    return type("BenchmarkPublication", (declarative_base(),), attributes)
+
+def load_publications(rows):
+    """Build a publications fact table by repeating the publications of the demo transformed export"""
+    df = build_fact_table(pd.read_csv(get_project_root() / "data/transformed/transformed_2021.csv"))
+    copies = [df.assign(EID=df["EID"] + f"-{i}") for i in range(rows // len(df) + 1)]
+    return apply_schema(pd.concat(copies, ignore_index=True).head(rows), "publications_fact")
+
+def table_checksum(session):
+    """Checksum of the benchmark table contents, independent of row order"""
+    return session.execute(text(
+        f"SELECT md5(string_agg(t::text, '|' ORDER BY t::text)) FROM {BENCHMARK_TABLE} t"
+    )).scalar()
+
+def main(rows=100_000, methods=("orm", "copy")):
+    model = make_benchmark_model()
+    df = load_publications(rows)
+    print(f"Benchmarking Postgres loading of {len(df):,} publication rows...")
+
+    db = DatabaseConnection()
+    db.connect()
+    model.metadata.drop_all(db.engine)
+    model.metadata.create_all(db.engine)
+    session = db.Session()
+
+    results = {}
+    try:
+        for method in methods:
+            session.execute(text(f"TRUNCATE {BENCHMARK_TABLE} RESTART IDENTITY"))
+            session.commit()
+
+            start = time.perf_counter()
+            load_to_warehouse(df.copy(), model, session, "postgres", method=method)
+            elapsed = time.perf_counter() - start
+            results[method] = (elapsed, table_checksum(session))
+    finally:
+        session.close()
+        model.metadata.drop_all(db.engine)
+
+    print(f"\n{'method':10}{'time (s)':>12}{'rows/s':>14}")
+    for method, (elapsed, _) in results.items():
+        print(f"{method:10}{elapsed:>12.2f}{len(df) / elapsed:>14,.0f}")
+    if "orm" in results and "copy" in results:
+        print(f"COPY speedup: {results['orm'][0] / results['copy'][0]:.1f}x")
+
+    if len({checksum for _, checksum in results.values()}) > 1:
+        print("The load methods produced different table contents!")
+        sys.exit(1)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the COPY and ORM Postgres loaders")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of publication rows to load")
+    parser.add_argument("--methods", nargs="+", default=["orm", "copy"], choices=["orm", "copy"])
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.rows, args.methods)
@@ -0,0 +1,83 @@
+import sys
+import time
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import pandas as pd
+from utils import get_project_root
+from etl import load_mapping_files, extract_country_name, extract_city_name, extract_affiliation_name
+from matchers import CityIndex, build_affiliation_matchers
+from legacy_etl import legacy_extract_affiliation_name, legacy_extract_city_name
+
+def load_moroccan_affiliations():
+    """Collect the affiliation of every Moroccan author in the demo export"""
+    project_root = get_project_root()
+    df = pd.read_csv(project_root / "data/raw/scopus-demo/2021.csv")
+
+    affiliations = []
+    for row_affiliations in df["Affiliations"].dropna():
+        for aff in row_affiliations.split(';'):
+            if extract_country_name(aff) in ["morocco", "maroc"]:
+                affiliations.append(aff)
+    return affiliations
+
+def time_calls(func, args, repeat):
+    """Return the best wall time of `repeat` runs over all arguments, and the results"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(*arg) for arg in args]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+def report(name, compile_time, legacy, compiled):
+    """Print the timings of one benchmark and return the number of mismatched results"""
+    legacy_time, legacy_results = legacy
+    compiled_time, compiled_results = compiled
+    mismatches = sum(1 for a, b in zip(legacy_results, compiled_results) if a != b)
+
+    print(f"\n{name}")
+    print(f"Compilation:          {compile_time * 1000:.1f} ms")
+    print(f"Legacy scan:          {legacy_time * 1000:.1f} ms")
+    print(f"Compiled:             {compiled_time * 1000:.1f} ms")
+    print(f"Speedup:              {legacy_time / compiled_time:.1f}x")
+    print(f"Mismatched results:   {mismatches}")
+    return mismatches
+
+def main(repeat=5):
+    cities_mapping, affiliations_by_city, universities_by_city = load_mapping_files()
+    affiliations = load_moroccan_affiliations()
+    print(f"Benchmarking matchers on {len(affiliations):,} Moroccan affiliations...")
+
+    # City resolution
+    start = time.perf_counter()
+    city_index = CityIndex(cities_mapping)
+    compile_time = time.perf_counter() - start
+
+    mismatches = report(
+        "City lookup", compile_time,
+        time_calls(lambda aff: legacy_extract_city_name(aff, cities_mapping), [(aff,) for aff in affiliations], repeat),
+        time_calls(lambda aff: extract_city_name(aff, city_index), [(aff,) for aff in affiliations], repeat),
+    )
+
+    # Affiliation resolution
+    pairs = [(aff, extract_city_name(aff, city_index)) for aff in affiliations]
+
+    start = time.perf_counter()
+    affiliation_matchers = build_affiliation_matchers(affiliations_by_city)
+    university_matchers = build_affiliation_matchers(universities_by_city)
+    compile_time = time.perf_counter() - start
+
+    mismatches += report(
+        "Affiliation matching", compile_time,
+        time_calls(lambda aff, city: legacy_extract_affiliation_name(aff, city, affiliations_by_city, universities_by_city), pairs, repeat),
+        time_calls(lambda aff, city: extract_affiliation_name(aff, city, affiliation_matchers, university_matchers), pairs, repeat),
+    )
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
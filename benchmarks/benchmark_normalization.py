@@ -0,0 +1,38 @@
+import sys
+import time
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import pandas as pd
+from text_normalization import normalize_affiliation, normalize_affiliation_series
+from legacy_etl import legacy_normalize_affiliation
+from benchmark_matchers import load_moroccan_affiliations, time_calls
+
+def main(repeat=5):
+    affiliations = load_moroccan_affiliations()
+    print(f"Benchmarking normalization on {len(affiliations):,} Moroccan affiliations...")
+
+    legacy_time, legacy_results = time_calls(legacy_normalize_affiliation, [(aff,) for aff in affiliations], repeat)
+    scalar_time, scalar_results = time_calls(normalize_affiliation, [(aff,) for aff in affiliations], repeat)
+
+    series = pd.Series(affiliations, dtype=object)
+    series_time = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        series_results = normalize_affiliation_series(series).tolist()
+        series_time = min(series_time, time.perf_counter() - start)
+
+    mismatches = sum(1 for a, b, c in zip(legacy_results, scalar_results, series_results) if not a == b == c)
+
+    print(f"Legacy:               {legacy_time * 1000:.1f} ms")
+    print(f"Precompiled:          {scalar_time * 1000:.1f} ms ({legacy_time / scalar_time:.1f}x)")
+    print(f"Series:               {series_time * 1000:.1f} ms ({legacy_time / series_time:.1f}x)")
+    print(f"Mismatched results:   {mismatches}")
+
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import pyarrow.parquet as pq
+from utils import get_project_root
+from metrics import run_measured
+
+# Stages benchmarked, in pipeline order: (name, script, extra arguments)
+STAGES = [
+    ("etl", "scripts/etl.py", ["--force"]),
+    ("combine_transformed", "scripts/combine_transformed.py", []),
+    ("build_fact_and_dimensions", "scripts/build_fact_and_dimensions.py", []),
+]
+LOAD_STAGE = ("load_to_warehouse", "scripts/load_to_warehouse.py", [])
+
+# Files copied from the repository into the benchmark data directory
+SUPPORT_FILES = ["transformed/affiliations.csv", "transformed/journal_categories_23.csv"]
+
+def count_rows(paths):
+    """Count the rows of Parquet tables from their metadata"""
+    return sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+
+def stage_rows(name, data_dir, raw_rows):
+    """Return the (rows in, rows out) of a stage from the tables around it"""
+    transformed = sorted((data_dir / "transformed").glob("transformed_*.parquet"))
+    combined = [data_dir / "final/combined_publications.parquet"]
+    fact = [data_dir / "fact/publications_fact.parquet", data_dir / "fact/authorships.parquet"]
+
+    if name == "etl":
+        return raw_rows, count_rows(transformed)
+    if name == "combine_transformed":
+        return count_rows(transformed), count_rows(combined)
+    if name == "build_fact_and_dimensions":
+        return count_rows(combined), count_rows(fact)
+    return count_rows(fact), count_rows(fact)
+
+def run_stage(script, args, env):
+    """Run one stage in a child process and return its wall time and resource usage"""
+    returncode, usage = run_measured([sys.executable, script, *args], env=env,
+                                     cwd=get_project_root() / "scripts", stdout=subprocess.DEVNULL)
+    if returncode != 0:
+        raise RuntimeError(f"{script} failed with exit code {returncode}")
+    return usage
+
+def benchmark(data_dir, raw_rows, load=False):
+    """Run every stage on the data directory and collect its metrics"""
+    env = dict(os.environ, PIPELINE_DATA_DIR=str(data_dir))
+    results = []
+
+    for name, script, args in STAGES + ([LOAD_STAGE] if load else []):
+        print(f"Running {name}...")
+        usage = run_stage(get_project_root() / script, args, env)
+        rows_in, rows_out = stage_rows(name, data_dir, raw_rows)
+        results.append({
+            "stage": name,
+            **usage,
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+            "rows_per_s": round(rows_in / usage["wall_s"]) if usage["wall_s"] else None,
+        })
+
+    return results
+
+def print_results(results):
+    print(f"\n{'Stage':28}{'wall (s)':>10}{'cpu (s)':>10}{'rows in':>12}{'rows/s':>12}{'peak MB':>10}")
+    for r in results:
+        print(f"{r['stage']:28}{r['wall_s']:>10.2f}{r['cpu_s']:>10.2f}{r['rows_in']:>12,}"
+              f"{r['rows_per_s']:>12,}{r['peak_rss_mb']:>10.1f}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic Scopus export")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of synthetic publications")
+    parser.add_argument("--years", type=int, nargs="+", default=[2021], help="One export file per year")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--load", action="store_true", help="Also benchmark load_to_warehouse (needs a database)")
+    parser.add_argument("--keep", type=Path, help="Keep the generated data in this directory")
+    parser.add_argument("--output", type=Path, default=Path("pipeline_benchmark.json"), help="Results file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    data_dir = args.keep or Path(tempfile.mkdtemp(prefix="scopus_benchmark_"))
+
+    try:
+        for support_file in SUPPORT_FILES:
+            (data_dir / support_file).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(get_project_root() / "data" / support_file, data_dir / support_file)
+
+        # Generated in a child process, since the peak RSS of the measured
+        # stages starts at the peak RSS of this process
+        subprocess.run([sys.executable, str(Path(__file__).resolve().parent / "generate_scopus_export.py"),
+                        "--rows", str(args.rows), "--years", *map(str, args.years),
+                        "--data-dir", str(data_dir), "--seed", str(args.seed)], check=True)
+        results = benchmark(data_dir, args.rows, args.load)
+    finally:
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_results(results)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "rows": args.rows,
+            "years": args.years,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "etl_workers": os.getenv("ETL_WORKERS"),
+            "stages": results,
+        }, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import pandas as pd
+from utils import get_project_root
+from table_io import read_table, write_table
+from benchmark_pipeline import SUPPORT_FILES
+
+def load_publications(rows, years, seed, data_dir):
+    """Build the combined publications table of a synthetic Scopus export
+
+    The export is generated, transformed and combined by the pipeline scripts
+    in `data_dir`, so the table has as many distinct values as real data.
+    """
+    for support_file in SUPPORT_FILES:
+        (data_dir / support_file).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(get_project_root() / "data" / support_file, data_dir / support_file)
+
+    generator = Path(__file__).resolve().parent / "generate_scopus_export.py"
+    env = dict(os.environ, PIPELINE_DATA_DIR=str(data_dir))
+    for command in ([str(generator), "--rows", str(rows), "--years", *map(str, years), "--seed", str(seed)],
+                    ["etl.py", "--force"], ["combine_transformed.py"]):
+        subprocess.run([sys.executable, *command], env=env, cwd=get_project_root() / "scripts",
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    return read_table(data_dir / "final/combined_publications.parquet", "combined_publications")
+
+def time_best(func, repeat):
+    """Return the best wall time of `repeat` runs and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(rows=100_000, years=(2021,), seed=42, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Generating and transforming {rows:,} synthetic publications...")
+        df = load_publications(rows, years, seed, Path(tmp_dir) / "data")
+        print(f"Benchmarking intermediate formats on {len(df):,} publication rows...")
+
+        csv_path = Path(tmp_dir) / "combined_publications.csv"
+        parquet_path = Path(tmp_dir) / "combined_publications.parquet"
+
+        csv_write, _ = time_best(lambda: df.to_csv(csv_path, index=False), repeat)
+        csv_read, _ = time_best(lambda: pd.read_csv(csv_path, dtype=str), repeat)
+        parquet_write, _ = time_best(lambda: write_table(df, parquet_path, "combined_publications", export_csv=False), repeat)
+        parquet_read, result = time_best(lambda: read_table(parquet_path, "combined_publications"), repeat)
+
+        csv_size = csv_path.stat().st_size / (1024 * 1024)
+        parquet_size = parquet_path.stat().st_size / (1024 * 1024)
+
+    print(f"{'':10}{'write (s)':>12}{'read (s)':>12}{'size (MB)':>12}")
+    print(f"{'CSV':10}{csv_write:>12.3f}{csv_read:>12.3f}{csv_size:>12.2f}")
+    print(f"{'Parquet':10}{parquet_write:>12.3f}{parquet_read:>12.3f}{parquet_size:>12.2f}")
+    print(f"Round trip speedup: {(csv_write + csv_read) / (parquet_write + parquet_read):.1f}x, "
+          f"size reduction: {csv_size / parquet_size:.1f}x")
+
+    if not result.equals(df):
+        print("Parquet round trip changed the data!")
+        sys.exit(1)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare CSV and Parquet for the combined publications table")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of synthetic publications")
+    parser.add_argument("--years", type=int, nargs="+", default=[2021], help="One export file per year")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each operation, the best is kept")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.rows, args.years, args.seed, args.repeat)
@@ -0,0 +1,241 @@
+import argparse
+import csv
+import json
+import random
+import sys
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import pandas as pd
+from utils import get_project_root, get_data_dir
+
+# Same columns, in the same order, as a real Scopus CSV export
+SCOPUS_COLUMNS = [
+    "Authors", "Author full names", "Author(s) ID", "Title", "Year", "Source title", "DOI", "Link",
+    "Affiliations", "Authors with affiliations", "Author Keywords", "Index Keywords", "Editors",
+    "Publisher", "ISSN", "ISBN", "CODEN", "PubMed ID", "Language of Original Document",
+    "Document Type", "Open Access", "Source", "EID",
+]
+
+# Columns of data/transformed/clean_journal_23.csv read by build_fact_and_dimensions.py
+JOURNAL_COLUMNS = ["Rank", "Sourceid", "Title", "Type", "Issn", "SJR", "Publisher", "Categories", "Best_Quartile"]
+
+# Document types and languages, weighted like the demo export
+DOCUMENT_TYPES = {
+    "Article": 85, "Conference paper": 5, "Review": 4, "Book chapter": 3,
+    "Letter": 1, "Erratum": 1, "Editorial": 0.5, "Note": 0.5,
+}
+LANGUAGES = {"English": 95, "French": 4, "Spanish": 1}
+
+# Number of authors of a publication: mostly small teams, a few large consortia
+AUTHOR_COUNTS = {1: 8, 2: 15, 3: 17, 4: 16, 5: 13, 6: 10, 7: 7, 8: 5, 9: 3, 10: 2, 12: 2, 15: 1}
+CONSORTIUM_SHARE = 0.002
+CONSORTIUM_SIZE = (200, 1200)
+
+SURNAMES = [
+    "Alaoui", "Benali", "Bennani", "Berrada", "Chraibi", "El Amrani", "El Idrissi", "Fassi",
+    "Haddad", "Kettani", "Lahlou", "Mansouri", "Naciri", "Ouazzani", "Rami", "Sebti",
+    "Tazi", "Zniber", "Ainane", "Hajji", "Smith", "Martin", "Garcia", "Müller", "Rossi",
+]
+FIRST_NAMES = [
+    "Mohamed", "Fatima", "Ahmed", "Khadija", "Youssef", "Salma", "Hassan", "Amina", "Omar",
+    "Nadia", "Rachid", "Imane", "Karim", "Meryem", "John", "Marie", "Carlos", "Anna",
+]
+TITLE_WORDS = [
+    "analysis", "model", "optimization", "learning", "synthesis", "characterization", "impact",
+    "evaluation", "network", "control", "water", "soil", "energy", "solar", "phosphate",
+    "health", "deep", "adsorption", "drought", "climate", "Morocco", "COVID-19", "composite",
+]
+
+# Foreign co-author affiliations as (institution, city, country)
+FOREIGN_AFFILIATIONS = [
+    ("Université Paris-Saclay", "Orsay", "France"),
+    ("Sorbonne Université", "Paris", "France"),
+    ("Universidad de Granada", "Granada", "Spain"),
+    ("Università di Bologna", "Bologna", "Italy"),
+    ("University of Lisbon", "Lisbon", "Portugal"),
+    ("Université de Montréal", "Montreal", "Canada"),
+    ("King Saud University", "Riyadh", "Saudi Arabia"),
+    ("University of Tunis El Manar", "Tunis", "Tunisia"),
+    ("Technische Universität München", "Munich", "Germany"),
+    ("Medicinal Research Institute", "Djibouti", "Djibouti"),
+]
+DEPARTMENTS = [
+    "Laboratory of Materials", "Department of Computer Science", "Department of Chemistry",
+    "Laboratory of Biotechnology", "Department of Physics", "Research Team in Applied Mathematics",
+]
+
+def weighted(rng, weights):
+    """Pick one key of a {value: weight} dict"""
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def load_vocabularies():
+    """Collect the real affiliation names, cities and ISSNs the exports are built from"""
+    project_root = get_project_root()
+    transformed_dir = project_root / "data/transformed"
+
+    affiliations_df = pd.read_csv(transformed_dir / "affiliations.csv")
+    with open(project_root / "mappers/cities_mapping.json", 'r', encoding='utf-8') as f:
+        cities_mapping = json.load(f)
+
+    # City spellings found in Scopus affiliations, by mapped city
+    city_spellings = {}
+    for spelling, city in cities_mapping.items():
+        city_spellings.setdefault(city, []).append(spelling.title())
+
+    moroccan = []
+    for en_name, fr_name, university, city in zip(
+        affiliations_df["Affiliation En Name"], affiliations_df["Affiliation"],
+        affiliations_df["University"], affiliations_df["City"],
+    ):
+        city = city.strip()
+        names = [name.strip() for name in (en_name, fr_name) if isinstance(name, str)]
+        moroccan.append((names, university.strip(), city_spellings.get(city, [city])))
+
+    issns = pd.read_csv(transformed_dir / "journal_categories_23.csv", dtype=str)["ISSN"].unique().tolist()
+    return moroccan, issns
+
+class ScopusExportGenerator:
+    """Generate Scopus-shaped publication rows from the real vocabularies
+
+    Authors come from a fixed pool of Scopus IDs, each with a home affiliation,
+    so the same authors and affiliation strings recur across publications like
+    in a real export.
+    """
+
+    def __init__(self, moroccan_affiliations, issns, author_pool=50_000, foreign_share=0.3, seed=42):
+        self.rng = random.Random(seed)
+        self.moroccan_affiliations = moroccan_affiliations
+        self.issns = issns
+        self.foreign_share = foreign_share
+        self.authors = [self.make_author(index) for index in range(author_pool)]
+        self.eid = 85_000_000_000
+
+    def make_author(self, index):
+        """Create one author of the pool: (id, surname, first name, affiliation string)"""
+        rng = self.rng
+        author_id = str(57_000_000_000 + index)
+        surname = rng.choice(SURNAMES)
+        first_name = rng.choice(FIRST_NAMES)
+
+        if rng.random() < self.foreign_share:
+            institution, city, country = rng.choice(FOREIGN_AFFILIATIONS)
+            affiliation = f"{rng.choice(DEPARTMENTS)}, {institution}, {city}, {country}"
+        else:
+            names, university, spellings = rng.choice(self.moroccan_affiliations)
+            parts = [rng.choice(names)]
+            if university not in parts and rng.random() < 0.5:
+                parts.append(university)
+            parts.append(rng.choice(spellings))
+            if rng.random() < 0.6:
+                parts.append(str(rng.randrange(10_000, 99_999, 10)))
+            parts.append("Morocco" if rng.random() < 0.95 else "Maroc")
+            affiliation = ", ".join(parts)
+
+        return author_id, surname, first_name, affiliation
+
+    def author_count(self):
+        if self.rng.random() < CONSORTIUM_SHARE:
+            return self.rng.randint(*CONSORTIUM_SIZE)
+        return weighted(self.rng, AUTHOR_COUNTS)
+
+    def publication(self, year):
+        """Generate one publication row, as a list of values in SCOPUS_COLUMNS order"""
+        rng = self.rng
+        self.eid += rng.randint(1, 50)
+        eid = f"2-s2.0-{self.eid}"
+        authors = rng.sample(self.authors, min(self.author_count(), len(self.authors)))
+
+        short_names = [f"{surname} {first_name[0]}." for _, surname, first_name, _ in authors]
+        affiliations = [affiliation for *_, affiliation in authors]
+        title = " ".join(rng.choices(TITLE_WORDS, k=rng.randint(4, 12))).capitalize()
+        document_type = weighted(rng, DOCUMENT_TYPES)
+
+        return [
+            "; ".join(short_names),
+            "; ".join(f"{surname}, {first_name} ({author_id})" for author_id, surname, first_name, _ in authors),
+            "; ".join(author_id for author_id, *_ in authors),
+            title,
+            year,
+            f"Journal of {rng.choice(TITLE_WORDS).capitalize()} Research",
+            f"10.{rng.randint(1000, 9999)}/{eid.lower()}" if rng.random() < 0.9 else "",
+            f"https://www.scopus.com/inward/record.uri?eid={eid}&partnerID=40",
+            "; ".join(affiliations),
+            "; ".join(f"{name}, {affiliation}" for name, affiliation in zip(short_names, affiliations)),
+            "; ".join(rng.sample(TITLE_WORDS, 3)),
+            "; ".join(rng.sample(TITLE_WORDS, 4)),
+            "",
+            "Elsevier",
+            rng.choice(self.issns) if document_type != "Book chapter" and rng.random() < 0.95 else "",
+            "",
+            "",
+            f"{rng.randint(30_000_000, 38_000_000)}.0" if rng.random() < 0.05 else "",
+            weighted(rng, LANGUAGES),
+            document_type,
+            "All Open Access; Gold Open Access" if rng.random() < 0.3 else "",
+            "Scopus",
+            eid,
+        ]
+
+def write_export(generator, path, rows, year, batch_size=10_000):
+    """Stream `rows` publications of one year to a Scopus CSV export"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(SCOPUS_COLUMNS)
+        for start in range(0, rows, batch_size):
+            writer.writerows(generator.publication(year) for _ in range(min(batch_size, rows - start)))
+
+def write_journals(issns, path, seed=42):
+    """Write a clean_journal_23.csv covering every ISSN of the generated exports"""
+    rng = random.Random(seed)
+    journals = pd.DataFrame({
+        "Rank": range(1, len(issns) + 1),
+        "Sourceid": range(10_000, 10_000 + len(issns)),
+        "Title": [f"Journal {issn}" for issn in issns],
+        "Type": "journal",
+        "Issn": issns,
+        "SJR": [round(rng.uniform(0.1, 5.0), 3) for _ in issns],
+        "Publisher": "Elsevier",
+        "Categories": "Engineering (miscellaneous) (Q2)",
+        "Best_Quartile": 2,
+    })
+    journals[JOURNAL_COLUMNS].to_csv(path, index=False, encoding='utf-8', quoting=1)
+
+def generate(rows, years, data_dir=None, author_pool=50_000, foreign_share=0.3, seed=42):
+    """Generate `rows` publications spread over one export file per year"""
+    data_dir = Path(data_dir) if data_dir else get_data_dir()
+    scopus_dir = data_dir / "raw/scopus-demo"
+    transformed_dir = data_dir / "transformed"
+    scopus_dir.mkdir(parents=True, exist_ok=True)
+    transformed_dir.mkdir(parents=True, exist_ok=True)
+
+    moroccan_affiliations, issns = load_vocabularies()
+    generator = ScopusExportGenerator(moroccan_affiliations, issns, author_pool, foreign_share, seed)
+
+    paths = []
+    for index, year in enumerate(years):
+        # Spread the remainder over the first files
+        file_rows = rows // len(years) + (index < rows % len(years))
+        path = scopus_dir / f"{year}.csv"
+        print(f"Writing {file_rows:,} publications to {path}...")
+        write_export(generator, path, file_rows, year)
+        paths.append(path)
+
+    write_journals(issns, transformed_dir / "clean_journal_23.csv", seed)
+    return paths
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic Scopus exports for benchmarking")
+    parser.add_argument("--rows", type=int, default=100_000, help="Total number of publications")
+    parser.add_argument("--years", type=int, nargs="+", default=[2021], help="One export file per year")
+    parser.add_argument("--data-dir", type=Path, help="Data directory to write into (default: PIPELINE_DATA_DIR or data/)")
+    parser.add_argument("--author-pool", type=int, default=50_000, help="Number of distinct authors")
+    parser.add_argument("--foreign-share", type=float, default=0.3, help="Share of authors with a foreign affiliation")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    generate(args.rows, args.years, args.data_dir, args.author_pool, args.foreign_share, args.seed)
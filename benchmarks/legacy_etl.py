@@ -0,0 +1,68 @@
+import re
+import unicodedata
+
+# The original ETL's affiliation resolution, which the optimized matchers and
+# normalization are benchmarked and tested against
+
+def legacy_remove_accents(text):
+    """Previous implementation: per-character generator over the NFKD text"""
+    normalized_text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in normalized_text if not unicodedata.combining(char))
+
+def legacy_normalize_digits(affiliation):
+    """Previous implementation: one re.sub per digit"""
+    patterns = {
+        r'\b(first|1st|1er|i)\b': '1',
+        r'\b(second|2nd|ii)\b': '2',
+        r'\b(fifth|5th|v)\b': '5'
+    }
+
+    normalized_affiliation = affiliation
+    for pattern, replacement in patterns.items():
+        normalized_affiliation = re.sub(pattern, replacement, normalized_affiliation)
+    return normalized_affiliation
+
+def legacy_normalize_affiliation(affiliation):
+    """Previous implementation of the affiliation normalization"""
+    affiliation = affiliation.lower()
+    affiliation = legacy_remove_accents(affiliation)
+    affiliation = legacy_normalize_digits(affiliation)
+    return affiliation
+
+def legacy_extract_city_name(affiliation_full_name, cities_mapping):
+    """Previous implementation: exact second-to-last part, then a linear substring scan"""
+    affiliation = affiliation_full_name.lower()
+    parts = affiliation.split(',')
+
+    if len(parts) > 1:
+        expected_city = parts[-2].strip().lower()
+        for key, value in cities_mapping.items():
+            if key == expected_city:
+                return value
+
+    for key, value in cities_mapping.items():
+        if key in affiliation:
+            return value
+
+    return None
+
+def legacy_scan_variants(variants_by_id, affiliation):
+    """Previous implementation: one regex search per variant, in mapper order"""
+    for key, values in variants_by_id.items():
+        for val in values:
+            if re.search(rf'\b{re.escape(val)}\b', affiliation):
+                return key, val
+    return None, None
+
+def legacy_extract_affiliation_name(affiliation_full_name, city, affiliations_by_city, universities_by_city):
+    """Previous implementation: the affiliation variants of the city, then its university variants"""
+    if not city:
+        return None, None
+
+    affiliation = legacy_normalize_affiliation(affiliation_full_name)
+
+    aff_id, variant = legacy_scan_variants(affiliations_by_city[city], affiliation)
+    if aff_id is not None or city not in universities_by_city:
+        return aff_id, variant
+
+    return legacy_scan_variants(universities_by_city[city], affiliation)
@@ -14,21 +14,20 @@ def get_project_root():
 # Add the project directories to Python path
 project_root = get_project_root()
 scripts_dir = project_root / 'scripts'
-models_dir = project_root / 'models'
-sys.path.extend([str(scripts_dir), str(models_dir)])
+sys.path.extend([str(scripts_dir), str(project_root)])
 
 # Import the ETL functions
 from translate_affiliations import main as translate_affiliations
 from prepare_cities_mapping import main as prepare_cities_mapping
 from prepare_affiliation_mappers import main as prepare_affiliation_mappers
-from etl import main as run_etl
+from etl import list_raw_files, transform_raw_file
 from combine_transformed import combine_transformed_files
 from build_fact_and_dimensions import main as build_fact_dimensions
 from transform_journal import main as transform_journal
 from load_to_warehouse import main as load_to_warehouse
 
 # Import database initialization for Airflow
-from init_db import init_database
+from models.init_db import init_database
 
 # Create necessary directories
 def create_directories():
@@ -38,6 +37,7 @@ def create_directories():
     (project_root / "mappers").mkdir(parents=True, exist_ok=True)
     (project_root / "data/final").mkdir(parents=True, exist_ok=True)
     (project_root / "data/dimensions").mkdir(parents=True, exist_ok=True)
+    (project_root / "data/analytics").mkdir(parents=True, exist_ok=True)
 
 # Define default arguments
 default_args = {
@@ -58,8 +58,15 @@ dag = DAG(
     start_date=datetime(2024, 1, 1),
     catchup=False,
     tags=['scopus', 'etl', 'universities'],
+    # Year suffix of the SJR export the journal dimensions are built from,
+    # e.g. "23"; empty uses the latest transformed year
+    params={'sjr_year': ''},
 )
 
+def raw_file_kwargs():
+    """Arguments of the mapped run_etl tasks, one per raw Scopus export"""
+    return [{'file_name': file_name} for file_name in list_raw_files()]
+
 # Create directories task
 create_dirs_task = PythonOperator(
     task_id='create_directories',
@@ -125,49 +132,72 @@ transform_journal_task = PythonOperator(
     # Transform Journal Task
     Transforms journal metadata and prepares it for the database.
     
-    Input: data/raw/journal_metrics.csv
-    Output: data/transformed/journal_metrics_transformed.csv
+    Input: data/raw/sjr/journal-<yy>.csv, every yearly SJR export
+    Output: 
+    - data/transformed/clean_journal_<yy>.csv
+    - data/transformed/journal_categories_<yy>.csv
+    """
+)
+
+list_raw_files_task = PythonOperator(
+    task_id='list_raw_files',
+    python_callable=raw_file_kwargs,
+    dag=dag,
+    doc_md="""
+    # List Raw Files Task
+    Lists the raw Scopus exports, one mapped run_etl task is created for each.
+    
+    Input: data/raw/scopus-demo/*.csv
     """
 )
 
-etl_task = PythonOperator(
+# One run_etl task per raw file, so the years are transformed in parallel across workers
+etl_task = PythonOperator.partial(
     task_id='run_etl',
-    python_callable=run_etl,
+    python_callable=transform_raw_file,
     dag=dag,
     doc_md="""
     # Run ETL Task
-    Transforms raw Scopus data using the mapping files.
+    Transforms one raw Scopus export using the mapping files. Files whose
+    content and mappers are unchanged since their last run are skipped.
     
     Input: 
-    - data/raw/scopus/2023.csv
+    - data/raw/scopus-demo/<name>.csv
     - All mapping files
-    Output: data/transformed/transformed_23.csv
+    Output: data/transformed/transformed_<name>.parquet
     """
-)
+).expand(op_kwargs=list_raw_files_task.output)
 
 combine_transformed_task = PythonOperator(
     task_id='combine_transformed',
     python_callable=combine_transformed_files,
+    # Still combine the existing outputs when there is no raw file to map over
+    trigger_rule='none_failed',
     dag=dag,
     doc_md="""
     # Combine Transformed Task
-    Combines all transformed CSV files and filters invalid entries.
+    Combines the outputs of every run_etl task and filters invalid entries.
     
-    Input: data/transformed/transformed_*.csv
-    Output: data/final/combined_data.csv
+    Input: data/transformed/transformed_*.parquet
+    Output: data/final/combined_publications.parquet
     """
 )
 
 build_dimensions_task = PythonOperator(
     task_id='build_fact_dimensions',
     python_callable=build_fact_dimensions,
+    op_kwargs={'sjr_year': '{{ params.sjr_year }}'},
     dag=dag,
     doc_md="""
     # Build Fact and Dimensions Task
-    Creates fact and dimension tables for the data warehouse.
+    Creates fact and dimension tables for the data warehouse, and the
+    pre-aggregated publication counts by university and by city.
+    The journal dimensions come from the SJR year of the `sjr_year` DAG
+    param, or from the latest year transformed when it is empty.
     
-    Input: data/final/combined_data.csv
-    Output: Multiple dimension and fact tables in data/warehouse/
+    Input: data/final/combined_publications.parquet, data/transformed/clean_journal_<yy>.csv
+    and data/transformed/journal_categories_<yy>.csv
+    Output: data/dimensions/*, data/fact/* and data/analytics/* tables
     """
 )
 
@@ -184,17 +214,17 @@ init_db_task = PythonOperator(
     """
 )
 
-load_to_postgres_task = PythonOperator(
-    task_id='load_to_postgres',
-    python_callable=load_to_postgres,
+load_to_warehouse_task = PythonOperator(
+    task_id='load_to_warehouse',
+    python_callable=load_to_warehouse,
     op_kwargs={'is_airflow': True},
     dag=dag,
     doc_md="""
-    # Load to Postgres Task
-    Loads fact and dimension tables into PostgreSQL database.
+    # Load to Warehouse Task
+    Loads fact and dimension tables into the warehouse database.
     
-    Input: data/warehouse/* tables
-    Output: Populated PostgreSQL database
+    Input: data/dimensions/*, data/fact/* and data/analytics/* tables
+    Output: Populated PostgreSQL or Snowflake database
     """
 )
 
@@ -213,4 +243,15 @@ load_to_postgres_task = PythonOperator(
 # )
 
 # Define task dependencies
-create_dirs_task >> translate_task >> cities_mapping_task >> affiliation_mappers_task >> transform_journal_task >> etl_task >> combine_transformed_task >> build_dimensions_task >> init_db_task >> load_to_postgres_task
+# Preparation tasks that do not depend on each other run in parallel
+create_dirs_task >> [translate_task, cities_mapping_task, transform_journal_task]
+translate_task >> affiliation_mappers_task
+
+# The ETL needs every mapper, then its mapped outputs are combined
+[cities_mapping_task, affiliation_mappers_task] >> list_raw_files_task >> etl_task >> combine_transformed_task
+
+# The star schema also needs the translated affiliations and the journals
+[combine_transformed_task, translate_task, transform_journal_task] >> build_dimensions_task
+
+# The database is only reset once the tables to load are built
+build_dimensions_task >> init_db_task >> load_to_warehouse_task
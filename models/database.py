@@ -6,9 +6,40 @@ from pathlib import Path
 import snowflake.connector
 from snowflake.sqlalchemy import URL
 
+# "full" drops and reloads every table, "incremental" upserts the dimensions
+# and only replaces the publication years that changed
+LOAD_MODES = ("full", "incremental")
+
+def get_load_mode():
+    """Get the warehouse load mode from the WAREHOUSE_LOAD_MODE environment variable"""
+    mode = os.getenv("WAREHOUSE_LOAD_MODE", "full")
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unsupported load mode: {mode}")
+    return mode
+
+def get_pool_settings():
+    """Get the connection pool settings of the engine from the environment
+    
+    DB_POOL_SIZE connections are kept open, and up to DB_MAX_OVERFLOW more are
+    opened when they are all in use. Connections are checked before use and
+    replaced after DB_POOL_RECYCLE seconds.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+def partition_by_year():
+    """Whether publications should be partitioned by Year on PostgreSQL (POSTGRES_PARTITION_BY_YEAR=1)"""
+    return os.getenv("POSTGRES_PARTITION_BY_YEAR", "0").lower() in ("1", "true", "yes")
+
 class DatabaseConnection:
     def __init__(self, is_airflow=False):
         self.engine = None
+        self.pool_size = None
         self.Session = None
         self.is_airflow = is_airflow
         
@@ -54,7 +85,7 @@ class DatabaseConnection:
         postgres_url = f"postgresql://{user}:{password}@{host}:{port}/{database}"
         print(f"Connecting to PostgreSQL database with URL: {postgres_url}")
         
-        self.engine = create_engine(postgres_url)
+        self._create_engine(postgres_url)
         self.Session = sessionmaker(bind=self.engine)
 
     def _connect_snowflake(self):
@@ -83,9 +114,15 @@ class DatabaseConnection:
         
         print(f"Connecting to Snowflake database: {database}.{schema}")
         
-        self.engine = create_engine(snowflake_url)
+        self._create_engine(snowflake_url)
         self.Session = sessionmaker(bind=self.engine)
 
+    def _create_engine(self, url):
+        """Create the engine with the pool settings of the environment"""
+        pool_settings = get_pool_settings()
+        self.pool_size = pool_settings["pool_size"]
+        self.engine = create_engine(url, **pool_settings)
+
     def get_session(self):
         """Get a new database session"""
         if not self.Session:
@@ -1,19 +1,58 @@
-from database import DatabaseConnection
-from schema import Base
+import os
+import sys
+from pathlib import Path
+from sqlalchemy import inspect, text
 
-def init_database(is_airflow=False):
-    """Initialize the database and create all tables"""
+# Add the project root to the Python path, so models is imported as a package
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models.database import DatabaseConnection, get_load_mode, partition_by_year
+from models.schema import Base, Publication, create_partitioned_publications
+
+def init_database(is_airflow=False, drop_existing=None):
+    """Initialize the database and create all tables
+    
+    Existing tables are dropped unless `drop_existing` is False, which is the
+    default for incremental loads (WAREHOUSE_LOAD_MODE=incremental). On
+    PostgreSQL, publications is partitioned by Year when
+    POSTGRES_PARTITION_BY_YEAR=1. The indexes are left to load_to_warehouse,
+    which builds them once the rows are in.
+    """
     try:
         # Create database connection
         db = DatabaseConnection(is_airflow=is_airflow)
         db.connect()
         
+        if drop_existing is None:
+            drop_existing = get_load_mode() == "full"
+        
         # Drop all tables
-        Base.metadata.drop_all(db.engine)
-        print("✅ Existing tables dropped successfully!")
+        db_type = os.getenv("DB_TYPE", "postgres")
+        if drop_existing and db_type == "postgres":
+            # CASCADE also drops the foreign keys of earlier schema versions,
+            # which drop_all does not know to drop first
+            preparer = db.engine.dialect.identifier_preparer
+            with db.engine.begin() as connection:
+                for table in reversed(Base.metadata.sorted_tables):
+                    connection.execute(text(f"DROP TABLE IF EXISTS {preparer.format_table(table)} CASCADE"))
+            print("✅ Existing tables dropped successfully!")
+        elif drop_existing:
+            Base.metadata.drop_all(db.engine)
+            print("✅ Existing tables dropped successfully!")
+        else:
+            print("✅ Keeping existing tables for an incremental load")
+        
+        # Create all tables defined in schema.py that do not exist yet
+        if db_type == "postgres" and partition_by_year():
+            publications = Publication.__table__
+            Base.metadata.create_all(db.engine, tables=[t for t in Base.metadata.sorted_tables if t is not publications])
+            if not inspect(db.engine).has_table(publications.name):
+                with db.engine.begin() as connection:
+                    create_partitioned_publications(connection)
+                print("✅ Publications partitioned by year")
+        else:
+            Base.metadata.create_all(db.engine)
         
-        # Create all tables defined in schema.py
-        Base.metadata.create_all(db.engine)
         print("✅ Database schema created successfully!")
         
     except Exception as e:
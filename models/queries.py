@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import inspect, text
+from models.database import DatabaseConnection
+from models.schema import LoadState
+
+# Query result cache: entries kept at most, and seconds an entry stays valid
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_CACHE_TTL = 300
+
+# Seconds between two checks of the last warehouse load, to drop results
+# cached before a load made by another process
+LOAD_CHECK_INTERVAL = 5
+
+# load_state row recording when load_to_warehouse last completed a load
+LAST_LOAD = ("warehouse", "last_load")
+
+# Named analytics queries (PostgreSQL) and the default values of their parameters
+QUERIES = {
+    # Authors of a university with the most publications
+    "top_authors": ("""
+        SELECT au.id AS author_id, au."Name" AS author, COUNT(DISTINCT a."EID") AS publications
+        FROM authorships a
+        JOIN authors au ON au.id = a."Author ID"
+        JOIN affiliations af ON af.id = a."Affiliation ID"
+        WHERE af."University" = :university
+        GROUP BY au.id, au."Name"
+        ORDER BY publications DESC, author
+        LIMIT :limit
+    """, {"limit": 10}),
+    # Publications per year of every affiliation, or of one
+    "output_per_year": ("""
+        SELECT af.id AS affiliation_id, af."Affiliation" AS affiliation, p."Year" AS year,
+               COUNT(DISTINCT p."EID") AS publications
+        FROM authorships a
+        JOIN publications p ON p."EID" = a."EID"
+        JOIN affiliations af ON af.id = a."Affiliation ID"
+        WHERE CAST(:affiliation_id AS INTEGER) IS NULL OR af.id = :affiliation_id
+        GROUP BY af.id, af."Affiliation", p."Year"
+        ORDER BY af."Affiliation", p."Year"
+    """, {"affiliation_id": None}),
+    # Publications and authors per year of every university, or of one, from the analytics cube
+    "university_output": ("""
+        SELECT "University" AS university, "Year" AS year, publications, authors
+        FROM publication_counts_by_university
+        WHERE "Category" = 'All' AND "Document Type" = 'All'
+          AND (CAST(:university AS VARCHAR) IS NULL OR "University" = :university)
+        ORDER BY "University", "Year"
+    """, {"university": None}),
+    # Publications by the best SJR quartile of their journal, of every university or of one
+    "journal_quartiles": ("""
+        SELECT COALESCE('Q' || j."Best Quartile", 'Unranked') AS quartile, COUNT(DISTINCT p."EID") AS publications
+        FROM publications p
+        JOIN authorships a ON a."EID" = p."EID"
+        LEFT JOIN journals j ON j."ISSN" = p."ISSN"
+        LEFT JOIN affiliations af ON af.id = a."Affiliation ID"
+        WHERE CAST(:university AS VARCHAR) IS NULL OR af."University" = :university
+        GROUP BY 1
+        ORDER BY 1
+    """, {"university": None}),
+    # Share of the publications of every university in journals of a given best SJR quartile
+    "quartile_share": ("""
+        SELECT af."University" AS university,
+               COUNT(DISTINCT p."EID") FILTER (WHERE j."Best Quartile" = :quartile) AS quartile_publications,
+               COUNT(DISTINCT p."EID") AS publications,
+               ROUND(COUNT(DISTINCT p."EID") FILTER (WHERE j."Best Quartile" = :quartile)::numeric
+                     / COUNT(DISTINCT p."EID"), 4) AS share
+        FROM authorships a
+        JOIN publications p ON p."EID" = a."EID"
+        JOIN affiliations af ON af.id = a."Affiliation ID"
+        LEFT JOIN journals j ON j."ISSN" = p."ISSN"
+        GROUP BY af."University"
+        ORDER BY share DESC, university
+    """, {"quartile": 1}),
+}
+
+class QueryCache:
+    """Bounded LRU cache of query results that expire after `ttl` seconds
+
+    Keeps hit/miss/eviction counters so the cache can be sized for the
+    dashboards, and is safe to share between threads.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached result of a query, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, result):
+        """Cache a result, evicting the least recently used entry when full"""
+        with self.lock:
+            self.entries[key] = (time.monotonic(), result)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached result"""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Return the cache counters"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries)}
+
+# Cache and connection of the current process, set up on first use
+_cache = QueryCache(int(os.getenv("QUERY_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+                    float(os.getenv("QUERY_CACHE_TTL", DEFAULT_CACHE_TTL)))
+_db = None
+_db_lock = threading.Lock()
+_last_load = None
+_last_load_check = None
+
+def get_database(is_airflow=False):
+    """Get the connection the queries run on, connecting on first use"""
+    global _db
+    with _db_lock:
+        if _db is None:
+            db = DatabaseConnection(is_airflow=is_airflow)
+            db.connect()
+            _db = db
+    return _db
+
+def invalidate_cache():
+    """Drop every cached query result, e.g. after a load"""
+    _cache.clear()
+
+def cache_stats():
+    """Return the counters of the query cache"""
+    return _cache.stats()
+
+def record_load(session):
+    """Record that a load completed, so every process drops its cached results"""
+    table_name, partition_key = LAST_LOAD
+    session.merge(LoadState(table_name=table_name, partition_key=partition_key, loaded_at=datetime.now()))
+    session.commit()
+    invalidate_cache()
+
+def check_last_load(db):
+    """Clear the cache when the warehouse was loaded since the last check, at most every LOAD_CHECK_INTERVAL seconds
+
+    A warehouse without a load_state table (not loaded yet, or created before
+    loads were recorded) has no load recorded.
+    """
+    global _last_load, _last_load_check
+    now = time.monotonic()
+    if _last_load_check is not None and now - _last_load_check < LOAD_CHECK_INTERVAL:
+        return
+
+    table_name, partition_key = LAST_LOAD
+    with db.engine.connect() as connection:
+        last_load = None
+        if inspect(connection).has_table(LoadState.__tablename__):
+            last_load = connection.execute(
+                text("SELECT loaded_at FROM load_state WHERE table_name = :table_name AND partition_key = :partition_key"),
+                {"table_name": table_name, "partition_key": partition_key},
+            ).scalar()
+    if last_load != _last_load:
+        invalidate_cache()
+    _last_load, _last_load_check = last_load, now
+
+def run_query(name, **params):
+    """Run a named query with its parameters and return the result as a DataFrame
+
+    Results are served from the cache until they expire, are evicted, or the
+    warehouse is loaded again.
+    """
+    sql, defaults = QUERIES[name]
+    params = {**defaults, **params}
+    key = (name, tuple(sorted(params.items())))
+
+    db = get_database()
+    check_last_load(db)
+    result = _cache.get(key)
+    if result is None:
+        with db.engine.connect() as connection:
+            rows = connection.execute(text(sql), params)
+            result = pd.DataFrame(rows.fetchall(), columns=list(rows.keys()))
+        _cache.put(key, result)
+
+    # Callers get their own copy, so they cannot modify the cached result
+    return result.copy()
+
+def top_authors(university, limit=10):
+    """Authors of a university with the most publications"""
+    return run_query("top_authors", university=university, limit=limit)
+
+def output_per_year(affiliation_id=None):
+    """Publications per year of every affiliation, or of one"""
+    return run_query("output_per_year", affiliation_id=affiliation_id)
+
+def university_output(university=None):
+    """Publications and authors per year of every university, or of one"""
+    return run_query("university_output", university=university)
+
+def journal_quartiles(university=None):
+    """Publications by the best SJR quartile of their journal, of every university or of one"""
+    return run_query("journal_quartiles", university=university)
+
+def quartile_share(quartile=1):
+    """Share of the publications of every university in journals of a given best SJR quartile"""
+    return run_query("quartile_share", quartile=quartile)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, ForeignKey, create_engine, MetaData
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Float, Date, DateTime, ForeignKey, create_engine, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -8,11 +8,12 @@ Base = declarative_base(metadata=metadata)
 class Publication(Base):
     """Fact table for publications from Moroccan Universities in Scopus.
 
-    This table stores detailed information about academic publications, including their
-    metadata and relationships to authors, journals, and affiliations.
+    This table stores detailed information about academic publications, one row
+    per publication. Their Moroccan authors and affiliations are in the
+    authorships bridge table.
 
     Attributes:
-        id (BigInteger): Primary key for the publication.
+        EID (String): Primary key - Scopus identifier of the publication.
         Title (String): Full title of the publication.
         Year (Integer): Publication year.
         Volume (String): Volume number of the publication.
@@ -24,12 +25,10 @@ class Publication(Base):
         Link (String): URL to access the publication.
         PubMed_ID (String): PubMed database identifier.
         Original_Language (String): Original language of the publication.
-        author_id (BigInteger): Foreign key to authors table.
-        affiliation_id (Integer): Foreign key to affiliations table.
     """
     __tablename__ = 'publications'
 
-    id = Column(BigInteger, primary_key=True)
+    EID = Column("EID", String, primary_key=True)
     Title = Column("Title", String)
     Year = Column("Year", Integer)
     Volume = Column("Volume", String)
@@ -44,8 +43,26 @@ class Publication(Base):
     
     # Foreign Keys
     # ISSN = Column("ISSN", String, ForeignKey('journals.ISSN'), key="ISSN")
-    author_id = Column("Author ID", BigInteger, ForeignKey('authors.id'), key="Author ID")
-    affiliation_id = Column("Affiliation ID", Integer, ForeignKey('affiliations.id'), key="Affiliation ID")
+
+
+class Authorship(Base):
+    """Bridge table between publications and their Moroccan authors.
+
+    One row per publication, author and affiliation the author signed the
+    publication with.
+
+    Attributes:
+        EID (String): Scopus identifier of the publication in the publications table.
+        author_id (BigInteger): Foreign key to authors table.
+        affiliation_id (Integer): Foreign key to affiliations table.
+    """
+    __tablename__ = 'authorships'
+
+    # Not a foreign key, since a publications table partitioned by year
+    # cannot have a unique EID
+    EID = Column("EID", String, primary_key=True)
+    author_id = Column("Author ID", BigInteger, ForeignKey('authors.id'), key="Author ID", primary_key=True)
+    affiliation_id = Column("Affiliation ID", Integer, ForeignKey('affiliations.id'), key="Affiliation ID", primary_key=True)
 
 
 class Journal(Base):
@@ -63,6 +80,7 @@ class Journal(Base):
         SJR (Float): SCImago Journal Rank indicator.
         Publisher (String): Name of the journal publisher.
         Areas (String): Research areas covered by the journal.
+        Best_Quartile (SmallInteger): Best SJR quartile (1 to 4) of the journal over its categories.
     """
     __tablename__ = 'journals'
 
@@ -74,15 +92,17 @@ class Journal(Base):
     SJR = Column("SJR", Float)
     Publisher = Column("Publisher", String)
     Categories = Column("Categories", String)
+    Best_Quartile = Column("Best Quartile", SmallInteger, key="Best Quartile")
 
 
 class JournalCategory(Base):
-    """Journal Category dimension table"""
+    """Journal Category dimension table, with the SJR quartile (1 to 4) of the journal in the category"""
     __tablename__ = "journal_categories"
 
     id = Column("id", Integer, primary_key=True)
     ISSN = Column("ISSN", String, ForeignKey("journals.ISSN"))
     Category = Column("Category", String)
+    Quartile = Column("Quartile", SmallInteger)
 
 
 class Author(Base):
@@ -126,3 +146,140 @@ class Affiliation(Base):
     University = Column(String)
     City = Column(String)
     Type = Column(String)  # university, institute, etc.
+
+
+class UniversityPublicationCount(Base):
+    """Pre-aggregated publication counts by university, year, category and document type.
+
+    Category and Document_Type are 'All' on the rows summing over them, where
+    a publication in several categories is only counted once.
+
+    Attributes:
+        id (Integer): Primary key.
+        University (String): Name of the university.
+        Year (Integer): Publication year.
+        Category (String): Journal category, or 'All'.
+        Document_Type (String): Type of document, or 'All'.
+        publications (Integer): Number of distinct publications.
+        authors (Integer): Number of distinct authors.
+    """
+    __tablename__ = 'publication_counts_by_university'
+
+    id = Column(Integer, primary_key=True)
+    University = Column(String)
+    Year = Column(Integer)
+    Category = Column(String)
+    Document_Type = Column("Document Type", String, key="Document Type")
+    publications = Column(Integer)
+    authors = Column(Integer)
+
+
+class CityPublicationCount(Base):
+    """Pre-aggregated publication counts by city, year, category and document type.
+
+    Same rollups as UniversityPublicationCount, by the city of the affiliations.
+    """
+    __tablename__ = 'publication_counts_by_city'
+
+    id = Column(Integer, primary_key=True)
+    City = Column(String)
+    Year = Column(Integer)
+    Category = Column(String)
+    Document_Type = Column("Document Type", String, key="Document Type")
+    publications = Column(Integer)
+    authors = Column(Integer)
+
+
+class LoadState(Base):
+    """Checksum of every table partition loaded into the warehouse.
+
+    Incremental loads compare these checksums with the new data to only
+    replace the partitions (publication years) that changed. The
+    ('warehouse', 'last_load') row records when the last load completed.
+
+    Attributes:
+        table_name (String): Name of the loaded table.
+        partition_key (String): Partition of the table, e.g. the publication year.
+        checksum (String): SHA-256 of the partition's rows when it was loaded.
+        loaded_at (DateTime): When the partition was loaded.
+    """
+    __tablename__ = 'load_state'
+
+    table_name = Column(String, primary_key=True)
+    partition_key = Column(String, primary_key=True)
+    checksum = Column(String)
+    loaded_at = Column(DateTime)
+
+
+# Indexes on the join and filter keys of the analyses: (table, index, columns, included columns).
+# They are only built on PostgreSQL, and rebuilt after the bulk load of a full load
+INDEXES = [
+    ("publications", "ix_publications_issn", ["ISSN"], []),
+    ("publications", "ix_publications_year", ["Year"], ["EID"]),
+    ("authorships", "ix_authorships_author_id", ["Author ID"], []),
+    # Covers the publication and author counts per affiliation
+    ("authorships", "ix_authorships_affiliation_id", ["Affiliation ID"], ["EID", "Author ID"]),
+    ("authors", "ix_authors_affiliation_id", ["affiliation_id"], []),
+    ("journal_categories", "ix_journal_categories_issn", ["ISSN"], ["Quartile"]),
+    # Covers the joins of the publications to the best quartile of their journal
+    ("journals", "ix_journals_issn_best_quartile", ["ISSN"], ["Best Quartile"]),
+    ("publication_counts_by_university", "ix_publication_counts_by_university_year", ["University", "Year"], []),
+    ("publication_counts_by_city", "ix_publication_counts_by_city_year", ["City", "Year"], []),
+]
+
+def create_indexes(connection):
+    """Create the missing indexes of INDEXES"""
+    preparer = connection.dialect.identifier_preparer
+    for table, name, columns, include in INDEXES:
+        sql = (f"CREATE INDEX IF NOT EXISTS {preparer.quote(name)} ON {preparer.quote(table)} "
+               f"({', '.join(preparer.quote(column) for column in columns)})")
+        if include:
+            sql += f" INCLUDE ({', '.join(preparer.quote(column) for column in include)})"
+        connection.execute(text(sql))
+
+def drop_indexes(connection):
+    """Drop the indexes of INDEXES, before a bulk load"""
+    preparer = connection.dialect.identifier_preparer
+    for _, name, _, _ in INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {preparer.quote(name)}"))
+
+def create_partitioned_publications(connection):
+    """Create the publications table partitioned by ranges of Year on PostgreSQL
+
+    Every year gets its own partition when it is first loaded (see
+    create_year_partitions), and publications without a year go to the
+    default partition. A primary key of a partitioned table must include the
+    partition column, and Year can be NULL, so the EID is only NOT NULL there.
+    """
+    table = Publication.__table__
+    preparer = connection.dialect.identifier_preparer
+    columns = []
+    for column in table.columns:
+        definition = f"{preparer.quote(column.name)} {column.type.compile(dialect=connection.dialect)}"
+        if column.primary_key:
+            definition += " NOT NULL"
+        columns.append(definition)
+    
+    connection.execute(text(
+        f"CREATE TABLE {preparer.quote(table.name)} ({', '.join(columns)}) PARTITION BY RANGE ({preparer.quote('Year')})"
+    ))
+    connection.execute(text(
+        f"CREATE TABLE {preparer.quote(table.name + '_default')} PARTITION OF {preparer.quote(table.name)} DEFAULT"
+    ))
+
+def create_year_partitions(connection, years):
+    """Create the missing partitions of the partitioned publications table, one per year"""
+    preparer = connection.dialect.identifier_preparer
+    table = Publication.__tablename__
+    for year in sorted(years):
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {preparer.quote(f'{table}_{year}')} PARTITION OF {preparer.quote(table)} "
+            f"FOR VALUES FROM ({int(year)}) TO ({int(year) + 1})"
+        ))
+
+def is_partitioned(connection, table_name):
+    """Whether a PostgreSQL table is partitioned"""
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table_name AND pg_table_is_visible(c.oid))"
+    ), {"table_name": table_name}).scalar()
@@ -1,6 +1,15 @@
+import os
 import pandas as pd
 from pathlib import Path
-from utils import get_project_root
+from utils import get_data_dir
+from table_io import read_table, write_table, table_path
+from transform_journal import best_quartile, expand_categories, journal_files
+from metrics import record_rows
+
+# Level of the analytics cubes standing for all categories or document types
+CUBE_ALL = "All"
+# Geographic levels the publications are aggregated to, each into its own cube
+CUBE_LEVELS = {"University": "publication_counts_by_university", "City": "publication_counts_by_city"}
 
 def build_author_dimension(combined_df):
     """Build author dimension table from combined data"""
@@ -26,10 +35,15 @@ def build_affiliation_dimension(affiliation_df):
 
 def build_journal_dimension(journal_df):
     """Build journal dimension table"""
+    # Journals transformed before their best quartile was kept have no
+    # Best_Quartile column, recover it from their categories
+    if 'Best_Quartile' not in journal_df.columns:
+        journal_df = journal_df.assign(Best_Quartile=best_quartile(journal_df, expand_categories(journal_df)))
+    
     # Select relevant columns
-    journals = journal_df[[
-        'Sourceid', 'Title', 'Issn', 'Rank', 'SJR', 'Publisher', 'Type', 'Categories',
-    ]].drop_duplicates(subset=['Issn'], keep='first')
+    journals = journal_df.reindex(columns=[
+        'Sourceid', 'Title', 'Issn', 'Rank', 'SJR', 'Publisher', 'Type', 'Categories', 'Best_Quartile',
+    ]).drop_duplicates(subset=['Issn'], keep='first')
     
     # Rename columns to match schema
     journals = journals.rename(columns={
@@ -39,32 +53,46 @@ def build_journal_dimension(journal_df):
     
     return journals
 
-def build_journal_categories(journal_categories_df):
+def build_journal_categories(journal_categories_df, journal_df):
     """Build journal categories dimension table"""
-    # Add an auto-incrementing ID starting from 1
     journal_categories = journal_categories_df.copy()
+    
+    # Categories transformed before their quartile was kept have no Quartile
+    # column, recover it from the categories of the journals
+    if 'Quartile' not in journal_categories.columns:
+        quartiles = expand_categories(journal_df).groupby(['ISSN', 'Category'], as_index=False)['Quartile'].min()
+        journal_categories = journal_categories.merge(quartiles, on=['ISSN', 'Category'], how='left')
+    
+    # Add an auto-incrementing ID starting from 1
     journal_categories['id'] = range(1, len(journal_categories) + 1)
 
     # Reorder columns to match schema
-    journal_categories = journal_categories[['id', 'ISSN', 'Category']]
+    journal_categories = journal_categories[['id', 'ISSN', 'Category', 'Quartile']]
     
     return journal_categories
 
+def with_eid(df):
+    """Keep the rows with an EID, a missing or empty one cannot key a publication"""
+    eids = df['EID'].astype("string").str.strip().fillna("")
+    return df[(eids != "").to_numpy()]
+
 def build_fact_table(combined_df):
-    """Build fact table by removing columns that are now in dimension tables"""
+    """Build the publication fact table, one row per Scopus EID
+
+    The combined data repeats the publication details for each of its
+    Moroccan authors, the authors are in the authorship table instead.
+    """
     # Select only the columns needed for the fact table
     fact_columns = [
-        "Author ID", "Affiliation ID", "Title", "Year",
+        "EID", "Title", "Year",
         "Document Type", "Source title", "DOI", "Link",
         "Language of Original Document", "ISSN", "PubMed ID", "Volume", "Issue"
     ]
 
-    fact_table = combined_df[fact_columns].copy()
+    fact_table = with_eid(combined_df[fact_columns]).drop_duplicates(subset=['EID'], keep='first')
 
     # Rename columns to match schema
     fact_table = fact_table.rename(columns={
-        'Author ID': 'author_id',
-        'Affiliation ID': 'affiliation_id',
         'Document Type': 'Document_Type',
         'Source title': 'Source_Title',
         'Language of Original Document': 'Original_Language',
@@ -73,32 +101,82 @@ def build_fact_table(combined_df):
     
     return fact_table
 
-def main():
+def build_authorship_table(combined_df):
+    """Build the authorship bridge table, one row per (publication, author, affiliation)"""
+    authorships = with_eid(combined_df[['EID', 'Author ID', 'Affiliation ID']]).drop_duplicates()
+
+    # Rename columns to match schema
+    authorships = authorships.rename(columns={
+        'Author ID': 'author_id',
+        'Affiliation ID': 'affiliation_id',
+    })
+    
+    return authorships
+
+def build_publication_cube(fact_table, authorships, affiliations, journal_categories, level):
+    """Count the publications and distinct authors by `level` x year x category x document type
+
+    The category and document type are also rolled up into CUBE_ALL rows, so
+    totals do not count a publication once per category.
+    """
+    publications = authorships.merge(fact_table[['EID', 'Year', 'Document_Type', 'ISSN']], on='EID').merge(
+        affiliations[['id', level]], left_on='affiliation_id', right_on='id', how='left')
+    publications = publications.merge(
+        journal_categories[['ISSN', 'Category']].drop_duplicates(), on='ISSN', how='left')
+    
+    cubes = []
+    for by_category in (True, False):
+        for by_document_type in (True, False):
+            keys = [level, 'Year'] + (['Category'] if by_category else []) + (['Document_Type'] if by_document_type else [])
+            counts = publications.groupby(keys, dropna=False, sort=False, observed=True).agg(
+                publications=('EID', 'nunique'),
+                authors=('author_id', 'nunique'),
+            ).reset_index()
+            if not by_category:
+                counts['Category'] = CUBE_ALL
+            if not by_document_type:
+                counts['Document_Type'] = CUBE_ALL
+            cubes.append(counts)
+    
+    cube = pd.concat(cubes, ignore_index=True).sort_values([level, 'Year', 'Category', 'Document_Type'], ignore_index=True)
+    cube['id'] = range(1, len(cube) + 1)
+    
+    return cube
+
+def main(sjr_year=None):
+    """Build the star schema tables
+
+    The journal dimensions are built from the transformed SJR files of
+    `sjr_year` (default $SJR_YEAR), or of the latest year transformed.
+    """
     print("\nBuilding dimension tables for star schema...")
     
     # Get paths
-    project_root = get_project_root()
-    transformed_dir = project_root / "data/transformed"
-    final_dir = project_root / "data/final"
-    fact_dir = project_root / "data/fact"
-    dimensions_dir = project_root / "data/dimensions"
+    data_dir = get_data_dir()
+    transformed_dir = data_dir / "transformed"
+    final_dir = data_dir / "final"
+    fact_dir = data_dir / "fact"
+    dimensions_dir = data_dir / "dimensions"
+    analytics_dir = data_dir / "analytics"
     fact_dir.mkdir(exist_ok=True)
     dimensions_dir.mkdir(exist_ok=True)
+    analytics_dir.mkdir(exist_ok=True)
     
     # Read the combined transformed data
     print("Reading combined transformed data...")
-    combined_file = final_dir / "combined_publications.csv"
-    combined_df = pd.read_csv(combined_file)
+    combined_file = table_path(final_dir, "combined_publications")
+    combined_df = read_table(combined_file, "combined_publications")
     
     # Read supporting files
     print("Reading supporting files...")
     affiliations_file = transformed_dir / "affiliations.csv"
-    journal_file = transformed_dir / "clean_journal_23.csv"
-    journal_categories_file = project_root / "data/transformed/journal_categories_23.csv"
+    journal_file, journal_categories_file = journal_files(transformed_dir, sjr_year or os.getenv("SJR_YEAR") or None)
+    print(f"Using SJR journal files {journal_file.name} and {journal_categories_file.name}")
     
     affiliations_df = pd.read_csv(affiliations_file)
-    journal_df = pd.read_csv(journal_file)
-    journal_categories_df = pd.read_csv(journal_categories_file)
+    # Read the ISSNs as text, keeping their leading zeros
+    journal_df = pd.read_csv(journal_file, dtype={'Issn': str})
+    journal_categories_df = pd.read_csv(journal_categories_file, dtype={'ISSN': str})
     
     # Build dimension tables
     print("Building author dimension...")
@@ -111,21 +189,39 @@ def main():
     journals = build_journal_dimension(journal_df)
     
     print("Building journal categories dimension...")
-    journal_categories = build_journal_categories(journal_categories_df)
+    journal_categories = build_journal_categories(journal_categories_df, journal_df)
+    if journal_categories['Quartile'].isna().all():
+        print(f" No SJR quartiles found in {journal_categories_file.name}, every journal will be unranked. "
+              "Run transform_journal on the raw SJR export to keep them")
     
     # Build fact table
     print("Building fact table...")
     fact_table = build_fact_table(combined_df)
     
+    print("Building authorship table...")
+    authorships = build_authorship_table(combined_df)
+    
+    # Build the pre-aggregated tables of the dashboards
+    print("Building analytics cubes...")
+    cubes = {
+        name: build_publication_cube(fact_table, authorships, affiliations, journal_categories, level)
+        for level, name in CUBE_LEVELS.items()
+    }
+    
     # Save all tables
     print("Saving tables...")
-    authors.to_csv(dimensions_dir / "authors.csv", index=False)
-    affiliations.to_csv(dimensions_dir / "affiliations.csv", index=False)
-    journals.to_csv(dimensions_dir / "journals.csv", index=False)
-    journal_categories.to_csv(dimensions_dir / "journal_categories.csv", index=False)
-    fact_table.to_csv(fact_dir / "publications_fact.csv", index=False)
+    write_table(authors, table_path(dimensions_dir, "authors"), "authors")
+    write_table(affiliations, table_path(dimensions_dir, "affiliations"), "affiliations")
+    write_table(journals, table_path(dimensions_dir, "journals"), "journals")
+    write_table(journal_categories, table_path(dimensions_dir, "journal_categories"), "journal_categories")
+    write_table(fact_table, table_path(fact_dir, "publications_fact"), "publications_fact")
+    write_table(authorships, table_path(fact_dir, "authorships"), "authorships")
+    for name, cube in cubes.items():
+        write_table(cube, table_path(analytics_dir, name), name)
     
     print("\nStar schema tables built successfully!")
+    print(f"{len(combined_df):,} author rows -> {len(fact_table):,} publications and {len(authorships):,} authorships")
+    record_rows(len(combined_df), len(fact_table) + len(authorships))
 
 if __name__ == "__main__":
     main()
@@ -1,64 +1,69 @@
-import pandas as pd
-from pathlib import Path
+import os
 from tqdm import tqdm
-from utils import get_project_root
+from utils import get_data_dir
+from table_io import TableWriter, iter_table, table_path
+from metrics import record_rows
 
-def combine_transformed_files():
+DEFAULT_CHUNK_SIZE = 100_000
+
+def combine_transformed_files(chunk_size=None):
     """
-    Combines all transformed CSV files from data/transformed directory,
+    Combines all transformed tables from data/transformed directory,
     filters out rows with empty affiliations, and saves the result.
+
+    The tables are streamed in chunks of `chunk_size` rows (default
+    $COMBINE_CHUNK_SIZE or DEFAULT_CHUNK_SIZE) appended to the output as
+    they are filtered, so memory does not grow with the number of files.
     """
+    if chunk_size is None:
+        chunk_size = int(os.getenv("COMBINE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+
     print("\nStarting to combine transformed files...")
-    
+
     # Get paths
-    project_root = get_project_root()
-    transformed_dir = project_root / "data/transformed"
-    output_dir = project_root / "data/final"
+    data_dir = get_data_dir()
+    transformed_dir = data_dir / "transformed"
+    output_dir = data_dir / "final"
     output_dir.mkdir(exist_ok=True)
-    
-    # Get list of all transformed CSV files
-    transformed_files = list(transformed_dir.glob("transformed_*.csv"))
-    
+
+    # Get list of all transformed tables
+    transformed_files = sorted(transformed_dir.glob("transformed_*.parquet"))
+
     if not transformed_files:
         print("No transformed files found in the transformed directory!")
         return
-    
+
     print(f"Found {len(transformed_files)} transformed files to process")
-    
-    # Initialize an empty list to store all dataframes
-    all_dfs = []
-    
-    # Read and combine all transformed files
-    for file_path in tqdm(transformed_files, desc="Reading files", unit="file"):
-        # Read CSV with affiliation_id as integer
-        df = pd.read_csv(file_path, dtype={'Affiliation ID': 'Int64'})
-        all_dfs.append(df)
-    
-    print("Combining all dataframes...")
-    combined_df = pd.concat(all_dfs, ignore_index=True)
-    
-    print("Filtering out rows with empty affiliations...")
-    # Filter out rows where either affiliation or affiliation_id is empty/null
-    filtered_df = combined_df.dropna(subset=['Affiliation ID'])
-    
-    # Convert affiliation_id to integer after filtering
-    filtered_df['Affiliation ID'] = filtered_df['Affiliation ID'].astype('int')
-    
+
+    # Statistics, accumulated chunk by chunk
+    total_rows = 0
+    filtered_rows = 0
+
+    output_path = table_path(output_dir, "combined_publications")
+    with TableWriter(output_path, "combined_publications") as writer:
+        for file_path in tqdm(transformed_files, desc="Combining files", unit="file"):
+            # Read the typed table, affiliation_id is already a nullable integer
+            # and the low cardinality columns categoricals
+            for chunk in iter_table(file_path, "transformed", chunk_size):
+                # Filter out rows where the affiliation_id is empty/null
+                filtered = chunk.dropna(subset=['Affiliation ID'])
+                total_rows += len(chunk)
+                filtered_rows += len(filtered)
+                if len(filtered):
+                    writer.write(filtered)
+
     # Print statistics
-    total_rows = len(combined_df)
-    filtered_rows = len(filtered_df)
     removed_rows = total_rows - filtered_rows
-    
+
     print(f"\nStatistics:")
     print(f"Total rows before filtering: {total_rows:,}")
     print(f"Rows with valid affiliations: {filtered_rows:,}")
     print(f"Rows removed: {removed_rows:,}")
-    print(f"Percentage of rows kept: {(filtered_rows/total_rows*100):.2f}%")
-    
-    # Save the combined and filtered data
-    output_path = output_dir / "combined_publications.csv"
-    filtered_df.to_csv(output_path, index=False)
+    if total_rows:
+        print(f"Percentage of rows kept: {(filtered_rows/total_rows*100):.2f}%")
+
     print(f"\nCombined and filtered data saved to: {output_path}")
+    record_rows(total_rows, filtered_rows)
 
 if __name__ == "__main__":
     combine_transformed_files()
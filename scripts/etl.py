@@ -1,12 +1,25 @@
+import argparse
 import logging
 import pandas as pd
+import numpy as np
 import json
-import re
-import unicodedata
 from pathlib import Path
 import os
+import multiprocessing
+import threading
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
-from utils import get_project_root, create_directories
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from utils import get_project_root, get_data_dir, create_directories, get_peak_rss_mb, file_sha256
+from matchers import CityIndex, build_affiliation_matchers
+from text_normalization import normalize_affiliation, normalize_affiliation_series
+from table_io import TableWriter, table_path
+from metrics import record_rows
 
 # Configure logging
 logging.basicConfig(
@@ -14,21 +27,32 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def extract_author_id_name(auth_id_name):
-    """Extract author ID and name from the combined string"""
-    # extract author name
-    name_pattern = r"[A-Za-záéíóúÁÉÍÓÚñÑ]+,\s[A-Za-záéíóúÁÉÍÓÚñÑ]+"
-    name_match = re.search(name_pattern, auth_id_name)
+AUTHOR_NAME_PATTERN = r"[A-Za-záéíóúÁÉÍÓÚñÑ]+,\s[A-Za-záéíóúÁÉÍÓÚñÑ]+"
+AUTHOR_ID_PATTERN = r'\((\d+)\)'
 
-    # extract id
-    id_match = re.search(r'\((\d+)\)', auth_id_name)
-    
-    if id_match and name_match:
-        author_id = id_match.group(1)
-        author_name = name_match.group()
-        return author_id, author_name
-    else:
-        return None, None
+MOROCCO_NAMES = ["morocco", "maroc"]
+
+PUBLICATION_COLUMNS = [
+    "EID", "Title", "Year", "Volume", "Issue", "ISSN", "Document Type", "Source title",
+    "DOI", "Link", "PubMed ID", "Language of Original Document"
+]
+OUTPUT_COLUMNS = ["Author ID", "Author Name", "Affiliation ID"] + PUBLICATION_COLUMNS
+
+# Pin the numeric columns and read every other column as text, so every chunk
+# of a file is typed the same way whatever values it holds (an ISSN or volume
+# column is otherwise read as numbers in a chunk without letters)
+RAW_DTYPES = defaultdict(lambda: str, {"Year": "Int64", "PubMed ID": "float64"})
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_CACHE_SIZE = 100_000
+
+# Inputs and version recorded in the manifest to decide if an output is up to date.
+# Bump ETL_VERSION whenever a change to the transformation changes its output.
+MAPPER_FILES = ["mappers/cities_mapping.json", "mappers/affiliations_by_city.json", "mappers/universities_by_city.json"]
+MANIFEST_FILE = "etl_manifest.json"
+ETL_VERSION = 3
+
+# Raw Scopus exports, relative to the data directory
+RAW_SCOPUS_DIR = "raw/scopus-demo"
 
 def extract_country_name(affiliation_full_name):
     """Extract country name from the full affiliation string"""
@@ -39,177 +63,431 @@ def extract_country_name(affiliation_full_name):
     except:
         return None
 
-def extract_city_name(affiliation_full_name, cities_mapping):
+def extract_city_name(affiliation_full_name, city_index):
     """Extract and map city name from the full affiliation string"""
-    affiliation = affiliation_full_name.lower()
-    parts = affiliation.split(',')
-    
-    expected_city = None
-    if len(parts) > 1:
-        expected_city = parts[-2].strip().lower()
-        for key, value in cities_mapping.items():
-            if key == expected_city:
-                return value
-    
-    for key, value in cities_mapping.items():
-        if key in affiliation:
-            return value
-    
-    return None
-
-def remove_accents(text):
-    """Remove accents from text"""
-    normalized_text = unicodedata.normalize('NFKD', text)
-    return ''.join(char for char in normalized_text if not unicodedata.combining(char))
-
-def normalize_digits(affiliation):
-    """Normalize numerical representations in text"""
-    patterns = {
-        r'\b(first|1st|1er|i)\b': '1',  # Variations of 1
-        r'\b(second|2nd|ii)\b': '2',    # Variations of 2
-        r'\b(fifth|5th|v)\b': '5'       # Variations of 5
-    }
-    
-    normalized_affiliation = affiliation
-    for pattern, replacement in patterns.items():
-        normalized_affiliation = re.sub(pattern, replacement, normalized_affiliation)
-    return normalized_affiliation
+    return city_index.lookup(affiliation_full_name.lower())
+
+def match_affiliation(affiliation, city, affiliation_matchers, university_matchers):
+    """Match a normalized affiliation against the compiled per-city matchers"""
+    if not city:
+        return None, None
+
+    aff_id, variant = affiliation_matchers[city].match(affiliation)
+    if aff_id is not None:
+        return aff_id, variant
 
-def normalize_affiliation(affiliation):
-    """Normalize affiliation text"""
-    affiliation = affiliation.lower()
-    affiliation = remove_accents(affiliation)
-    affiliation = normalize_digits(affiliation)
-    return affiliation
+    if city not in university_matchers:
+        return None, None
+    
+    return university_matchers[city].match(affiliation)
 
-def extract_affiliation_name(affiliation_full_name, city, affiliations_by_city, universities_by_city):
-    """Extract standardized affiliation name"""
+def extract_affiliation_name(affiliation_full_name, city, affiliation_matchers, university_matchers):
+    """Extract standardized affiliation name using the compiled per-city matchers"""
     if not city:
         return None, None
     
     affiliation = normalize_affiliation(affiliation_full_name)
+    return match_affiliation(affiliation, city, affiliation_matchers, university_matchers)
 
-    for key, values in affiliations_by_city[city].items():
-        for val in values:
-            if re.search(rf'\b{re.escape(val)}\b', affiliation):
-                return key, val
+def split_author_affiliations(df):
+    """Split authors and affiliations into aligned (row, author, affiliation) pairs"""
+    authors = df["Author full names"].fillna("").str.split(';')
+    affiliations = df["Affiliations"].fillna("").str.split(';')
 
-    if city not in universities_by_city.keys():
-        return None, None
-        
-    for key, values in universities_by_city[city].items():
-        for val in values:
-            if re.search(rf'\b{re.escape(val)}\b', affiliation):
-                return key, val
-    
-    return None, None
-
-def transform_data(df, cities_mapping, affiliations_by_city, universities_by_city):
-    """Transform the data using the mapping files"""
-    new_df = pd.DataFrame(columns=pd.Series([
-        "Author ID", "Author Name", "Affiliation ID", "Title", "Year", "Volume", "Issue",
-        "ISSN", "Document Type", "Source title", "DOI", "Link", "PubMed ID", "Language of Original Document"
-        ]))
-
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Transforming rows", unit="row", leave=False):
-        authors_with_ids = row["Author full names"].split(';')
-        raw_affiliations = row["Affiliations"].split(';')
-        
-        ids, names, affiliation_ids = [], [], []
+    # Like zip(), keep only as many pairs as the shorter of the two lists
+    pair_counts = np.minimum(authors.str.len(), affiliations.str.len()).to_numpy()
+
+    authors = authors.explode()
+    affiliations = affiliations.explode()
+    authors = authors[authors.groupby(level=0).cumcount().to_numpy() < pair_counts[authors.index]]
+    affiliations = affiliations[affiliations.groupby(level=0).cumcount().to_numpy() < pair_counts[affiliations.index]]
+
+    return pd.DataFrame({
+        "row": authors.index.to_numpy(),
+        "author": authors.to_numpy(),
+        "affiliation": affiliations.to_numpy(),
+    })
+
+class ResolutionCache:
+    """Bounded LRU cache of raw affiliation string -> (country, city, affiliation id)
+
+    Keeps hit/miss/eviction counters so the cache can be sized for the data.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, affiliation, occurrences=1):
+        """Return the cached resolution of the affiliation, or None
+
+        `occurrences` counts repeated lookups of the same string at once: after
+        a miss, the repeats are served from the cache and count as hits.
+        """
+        resolution = self.entries.get(affiliation)
+        if resolution is None:
+            self.misses += 1
+            self.hits += occurrences - 1
+            return None
         
-        for auth_id_name, aff in zip(authors_with_ids, raw_affiliations):
-            author_id, author_name = extract_author_id_name(auth_id_name)
-            
-            if not (author_id and author_name):
-                continue
+        self.hits += occurrences
+        self.entries.move_to_end(affiliation)
+        return resolution
 
-            # Extract country
-            country = extract_country_name(aff)
-            if country not in ["morocco", "maroc"]:
-                continue
-            
-            # Extract city
-            city = extract_city_name(aff, cities_mapping)
-
-            # Extract affiliation id only
-            aff_id, _ = extract_affiliation_name(aff, city, affiliations_by_city, universities_by_city)
-
-            ids.append(author_id)
-            names.append(author_name)
-            affiliation_ids.append(aff_id)
-
-        # Only proceed if we found valid Moroccan authors
-        if ids:
-            # Get publication details
-            pub_data = {
-                "Author ID": ids,
-                "Author Name": names,
-                "Affiliation ID": affiliation_ids,
-                "Title": [row.get("Title", "")] * len(ids),
-                "Year": [row.get("Year", None)] * len(ids),
-                "Volume": [row.get("Volume", "")] * len(ids),
-                "Issue": [row.get("Issue", "")] * len(ids),
-                "ISSN": [row.get("ISSN", "")] * len(ids),
-                "Document Type": [row.get("Document Type", "")] * len(ids),
-                "Source title": [row.get("Source title", "")] * len(ids),
-                "DOI": [row.get("DOI", "")] * len(ids),
-                "Link": [row.get("Link", "")] * len(ids),
-                "PubMed ID": [row.get("PubMed ID", "")] * len(ids),
-                "Language of Original Document": [row.get("Language of Original Document", "")] * len(ids)
-            }
+    def put(self, affiliation, resolution):
+        """Cache a resolution, evicting the least recently used entry when full"""
+        self.entries[affiliation] = resolution
+        self.entries.move_to_end(affiliation)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Return the cache counters"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries)}
+
+def resolve_affiliation(affiliation_full_name, normalized_affiliation, city_index, affiliation_matchers, university_matchers):
+    """Resolve the country, city and affiliation id of a raw affiliation string"""
+    country = extract_country_name(affiliation_full_name)
+    city = extract_city_name(affiliation_full_name, city_index)
+    aff_id, _ = match_affiliation(normalized_affiliation, city, affiliation_matchers, university_matchers)
+    return country, city, aff_id
 
-            data = pd.DataFrame(pub_data)
-            new_df = pd.concat([new_df, data], ignore_index=True) # , verify_integrity=True
+def resolve_affiliation_ids(affiliations, city_index, affiliation_matchers, university_matchers, cache):
+    """Resolve the affiliation id of each distinct affiliation string through the cache"""
+    resolved, misses = {}, []
+    for aff, occurrences in affiliations.value_counts(sort=False).items():
+        resolution = cache.get(aff, occurrences)
+        if resolution is None:
+            misses.append(aff)
+        else:
+            resolved[aff] = resolution[2]
     
-    return new_df
+    # Normalize the cache misses in bulk before matching them
+    misses = pd.Series(misses, dtype=object)
+    for aff, normalized_aff in zip(misses, normalize_affiliation_series(misses)):
+        resolution = resolve_affiliation(aff, normalized_aff, city_index, affiliation_matchers, university_matchers)
+        cache.put(aff, resolution)
+        resolved[aff] = resolution[2]
+    
+    return affiliations.map(resolved)
+
+def transform_data(df, city_index, affiliation_matchers, university_matchers, cache=None):
+    """Transform the data using the city index and the compiled affiliation matchers"""
+    if cache is None:
+        cache = ResolutionCache()
+    
+    # The EID keys the publications of the fact table, an export without it
+    # would merge all of them into one
+    if "EID" not in df.columns:
+        raise ValueError("The raw export has no EID column")
+    
+    df = df.reset_index(drop=True)
+    pairs = split_author_affiliations(df)
+
+    # Extract author id and name
+    author_ids = pairs["author"].str.extract(AUTHOR_ID_PATTERN, expand=False)
+    author_names = pairs["author"].str.extract(f"({AUTHOR_NAME_PATTERN})", expand=False)
+
+    # Extract country
+    countries = pairs["affiliation"].str.lower().str.split(',').str[-1].str.strip()
+
+    # Keep only the valid Moroccan authors
+    mask = (author_ids.notna() & author_names.notna() & countries.isin(MOROCCO_NAMES)).to_numpy()
+    pairs = pairs[mask]
+    
+    # Extract city and affiliation id
+    affiliation_ids = resolve_affiliation_ids(pairs["affiliation"], city_index, affiliation_matchers, university_matchers, cache)
+
+    rows = pairs["row"].to_numpy()
+    data = {
+        "Author ID": author_ids[mask].to_numpy(),
+        "Author Name": author_names[mask].to_numpy(),
+        "Affiliation ID": affiliation_ids.to_numpy(),
+    }
+    
+    # Repeat the publication details for each of its Moroccan authors
+    for col in PUBLICATION_COLUMNS:
+        if col in df.columns:
+            data[col] = df[col].iloc[rows].reset_index(drop=True)
+        else:
+            data[col] = None if col == "Year" else ""
+
+    return pd.DataFrame(data, columns=OUTPUT_COLUMNS)
 
 def load_mapping_files():
     """Load all mapping files"""
     project_root = get_project_root()
     
-    # Load cities mapping
-    with open(project_root / "mappers/cities_mapping.json", 'r', encoding='utf-8') as f:
-        cities_mapping = json.load(f)
+    # Load cities mapping, affiliations by city and universities by city
+    mappers = []
+    for mapper_file in MAPPER_FILES:
+        with open(project_root / mapper_file, 'r', encoding='utf-8') as f:
+            mappers.append(json.load(f))
     
-    # Load affiliations by city
-    with open(project_root / "mappers/affiliations_by_city.json", 'r', encoding='utf-8') as f:
-        affiliations_by_city = json.load(f)
+    cities_mapping, affiliations_by_city, universities_by_city = mappers
+    return cities_mapping, affiliations_by_city, universities_by_city
+
+def load_manifest(manifest_path):
+    """Load the ETL manifest, or an empty one if there is none yet"""
+    if not manifest_path.exists():
+        return {"files": {}}
     
-    # Load universities by city
-    with open(project_root / "mappers/universities_by_city.json", 'r', encoding='utf-8') as f:
-        universities_by_city = json.load(f)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_path):
+    """Save the ETL manifest atomically"""
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, manifest_path)
+
+def update_manifest_entry(manifest_path, file_name, entry):
+    """Set (or remove, when entry is None) one file's manifest entry
+
+    The manifest is re-read under a lock, so files transformed by parallel
+    runs (like the mapped Airflow tasks) do not overwrite each other's entries.
+    """
+    with open(manifest_path.with_suffix('.lock'), 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_manifest(manifest_path)
+        if entry is None:
+            if manifest["files"].pop(file_name, None) is None:
+                return
+        else:
+            manifest["files"][file_name] = entry
+        save_manifest(manifest, manifest_path)
+
+def get_mappers_state():
+    """Hash the mapper files together with the ETL version"""
+    project_root = get_project_root()
+    return {
+        "etl_version": ETL_VERSION,
+        "mappers": {mapper_file: file_sha256(project_root / mapper_file) for mapper_file in MAPPER_FILES},
+    }
+
+def plan_files(csv_files, transformed_dir, manifest, mappers_state, force=False):
+    """Split the raw files into those to transform and those whose output is up to date
+
+    Returns the files to transform with the reason, the skipped files and the
+    hash of every raw file.
+    """
+    to_transform, skipped, raw_hashes = [], [], {}
     
-    return cities_mapping, affiliations_by_city, universities_by_city
+    for file_path in csv_files:
+        raw_hashes[file_path.name] = file_sha256(file_path)
+        entry = manifest["files"].get(file_path.name)
+        output_path = table_path(transformed_dir, f"transformed_{file_path.stem}")
+        
+        if force:
+            reason = "forced"
+        elif entry is None:
+            reason = "new file"
+        elif not output_path.exists():
+            reason = "output missing"
+        elif entry["raw_sha256"] != raw_hashes[file_path.name]:
+            reason = "raw content changed"
+        elif entry["mappers"] != mappers_state["mappers"]:
+            reason = "mappers changed"
+        elif entry["etl_version"] != mappers_state["etl_version"]:
+            reason = "ETL version changed"
+        else:
+            skipped.append(file_path)
+            continue
+        
+        to_transform.append((file_path, reason))
+    
+    return to_transform, skipped, raw_hashes
+
+def read_raw_chunks(file_path, chunk_size=None):
+    """Read a raw Scopus export, in chunks of `chunk_size` rows when given"""
+    if not chunk_size:
+        yield pd.read_csv(file_path, dtype=RAW_DTYPES)
+        return
+    
+    yield from pd.read_csv(file_path, dtype=RAW_DTYPES, chunksize=chunk_size)
 
-def main():
-    print("\nLoading mapping files...")
+# Mappers, compiled matchers and resolution cache of the current process, set once by init_worker
+_worker_mappers = None
+_worker_cache = None
+
+def init_worker(cache_size=DEFAULT_CACHE_SIZE):
+    """Load the mapping files and compile the matchers once per process"""
+    global _worker_mappers, _worker_cache
     cities_mapping, affiliations_by_city, universities_by_city = load_mapping_files()
+    _worker_mappers = (
+        CityIndex(cities_mapping),
+        build_affiliation_matchers(affiliations_by_city),
+        build_affiliation_matchers(universities_by_city),
+    )
+    _worker_cache = ResolutionCache(cache_size)
+
+def transform_chunk(chunk):
+    """Transform one chunk with the mappers loaded by init_worker
+
+    Returns the transformed chunk and the cache counters accumulated while transforming it.
+    """
+    before = _worker_cache.stats()
+    transformed_df = transform_data(chunk, *_worker_mappers, cache=_worker_cache)
+    after = _worker_cache.stats()
     
-    print("Processing all files in scopus directory...")
-    project_root = get_project_root()
-    scopus_dir = project_root / "data/raw/scopus-demo"
-    transformed_dir = project_root / "data/transformed"
+    cache_stats = {key: after[key] - before[key] for key in ("hits", "misses", "evictions")}
+    return transformed_df, cache_stats
+
+def iter_file_chunks(csv_files, chunk_size):
+    """Yield (file_path, chunk_index, chunk) for every chunk of every file"""
+    for file_path in csv_files:
+        for i, chunk in enumerate(read_raw_chunks(file_path, chunk_size)):
+            yield file_path, i, chunk
+
+def transform_chunks(chunks, workers, cache_size):
+    """Transform chunks, yielding (file_path, chunk_index, rows_in, (transformed_df, cache_stats)) in input order"""
+    if workers <= 1:
+        init_worker(cache_size)
+        for file_path, i, chunk in chunks:
+            yield file_path, i, len(chunk), transform_chunk(chunk)
+        return
+    
+    # Keep a bounded number of chunks in flight so memory stays bounded,
+    # and collect them in submission order so the output is deterministic
+    max_pending = 2 * workers
+    # Forking is unsafe while run_pipeline runs other stages in threads,
+    # so workers then start from a clean server process where there is one
+    mp_context = None
+    if threading.current_thread() is not threading.main_thread() and "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=init_worker, initargs=(cache_size,)) as executor:
+        pending = deque()
+        for file_path, i, chunk in chunks:
+            pending.append((file_path, i, len(chunk), executor.submit(transform_chunk, chunk)))
+            if len(pending) >= max_pending:
+                file_path, i, rows_in, future = pending.popleft()
+                yield file_path, i, rows_in, future.result()
+        
+        while pending:
+            file_path, i, rows_in, future = pending.popleft()
+            yield file_path, i, rows_in, future.result()
+
+def report_file(file_path, output_path, rows_in, rows_out, cache_stats):
+    """Print the summary of a transformed file"""
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    hit_rate = cache_stats["hits"] / lookups * 100 if lookups else 0.0
+    
+    print(f"\n{file_path.name}: transformed {rows_in:,} publications into {rows_out:,} author rows")
+    print(f"Transformed data saved to {output_path}")
+    print(f"Affiliation cache: {cache_stats['hits']:,} hits, {cache_stats['misses']:,} misses "
+          f"({hit_rate:.1f}% hit rate), {cache_stats['evictions']:,} evictions")
+    print(f"Peak memory so far: {get_peak_rss_mb():,.1f} MB")
+
+def list_raw_files():
+    """List the names of the raw Scopus exports"""
+    return [file_path.name for file_path in sorted((get_data_dir() / RAW_SCOPUS_DIR).glob("*.csv"))]
+
+def transform_raw_file(file_name, force=False):
+    """Transform a single raw Scopus export (one mapped Airflow task per file)"""
+    main(force=force, files=[file_name])
+
+def main(chunk_size=None, workers=None, cache_size=None, force=False, files=None):
+    if chunk_size is None:
+        chunk_size = int(os.getenv("ETL_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+    if workers is None:
+        workers = int(os.getenv("ETL_WORKERS", 1))
+    if cache_size is None:
+        cache_size = int(os.getenv("ETL_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    
+    print("Processing " + (", ".join(files) if files else "all files") + " in scopus directory...")
+    data_dir = get_data_dir()
+    scopus_dir = data_dir / RAW_SCOPUS_DIR
+    transformed_dir = data_dir / "transformed"
+    manifest_path = transformed_dir / MANIFEST_FILE
     
     # Create output directory if it doesn't exist
     create_directories()
     
-    # Get list of CSV files
-    csv_files = list(scopus_dir.glob("*.csv"))
+    # Get list of CSV files, or only the requested ones
+    if files:
+        csv_files = [scopus_dir / file_name for file_name in files]
+    else:
+        csv_files = sorted(scopus_dir.glob("*.csv"))
     
-    # Process all CSV files in the scopus directory with progress bar
-    for file_path in tqdm(csv_files, desc="Overall progress", unit="file"):
-        print(f"\nProcessing {file_path.name}...")
-        df = pd.read_csv(file_path)
-        
-        print(f"Transforming {file_path.name}...")
-        transformed_df = transform_data(df, cities_mapping, affiliations_by_city, universities_by_city)
+    # Skip the files whose raw content and mappers are unchanged since their last transformation
+    manifest = load_manifest(manifest_path)
+    mappers_state = get_mappers_state()
+    to_transform, skipped, raw_hashes = plan_files(csv_files, transformed_dir, manifest, mappers_state, force)
+    
+    for file_path in skipped:
+        print(f"Skipping {file_path.name}: raw content and mappers unchanged, reusing transformed_{file_path.stem}")
+    for file_path, reason in to_transform:
+        print(f"Transforming {file_path.name}: {reason}")
+    
+    if not to_transform:
+        print("\nAll transformed files are up to date!")
+        record_rows(0, 0)
+        return
+    
+    print(f"Transforming {len(to_transform)} files"
+          + (f" in chunks of {chunk_size:,} rows" if chunk_size else "")
+          + (f" with {workers} workers" if workers > 1 else "") + "...")
+    
+    totals = {"rows_in": 0, "rows_out": 0}
+    
+    def finish_file(current):
+        current.pop("writer").close()
+        report_file(**current)
+        totals["rows_in"] += current["rows_in"]
+        totals["rows_out"] += current["rows_out"]
+        file_name = current["file_path"].name
+        update_manifest_entry(manifest_path, file_name, {"raw_sha256": raw_hashes[file_name], **mappers_state})
+    
+    current = None
+    chunks = iter_file_chunks([file_path for file_path, _ in to_transform], chunk_size)
+    for file_path, i, rows_in, (transformed_df, cache_stats) in tqdm(transform_chunks(chunks, workers, cache_size), desc="Transforming chunks", unit="chunk"):
+        if i == 0:
+            if current:
+                finish_file(current)
+            # Forget the file until it is fully written, so an interrupted run is not reused
+            update_manifest_entry(manifest_path, file_path.name, None)
+            
+            # Save transformed data with transformed_ prefix
+            output_path = table_path(transformed_dir, f"transformed_{file_path.stem}")
+            current = {
+                "file_path": file_path, "output_path": output_path, "rows_in": 0, "rows_out": 0,
+                "cache_stats": {"hits": 0, "misses": 0, "evictions": 0},
+                "writer": TableWriter(output_path, "transformed"),
+            }
         
-        # Save transformed data with transformed_ prefix
-        output_path = transformed_dir / f"transformed_{file_path.name}"
-        transformed_df.to_csv(output_path, index=False)
-        print(f"Transformed data saved to {output_path}")
+        current["writer"].write(transformed_df)
+        current["rows_in"] += rows_in
+        current["rows_out"] += len(transformed_df)
+        for key, value in cache_stats.items():
+            current["cache_stats"][key] += value
+    
+    if current:
+        finish_file(current)
     
     print("\nETL process completed successfully!")
+    record_rows(totals["rows_in"], totals["rows_out"])
+    print(f"Peak memory: {get_peak_rss_mb():,.1f} MB" + (f" (workers: {get_peak_rss_mb(children=True):,.1f} MB)" if workers > 1 else ""))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transform the raw Scopus exports")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help=f"Rows read per chunk, 0 reads each file at once (default: $ETL_CHUNK_SIZE or {DEFAULT_CHUNK_SIZE:,})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes transforming chunks in parallel (default: $ETL_WORKERS or 1)")
+    parser.add_argument("--cache-size", type=int, default=None,
+                        help=f"Affiliation strings kept in each process's resolution cache (default: $ETL_CACHE_SIZE or {DEFAULT_CACHE_SIZE:,})")
+    parser.add_argument("--force", action="store_true",
+                        help="Transform every file, even those whose raw content and mappers are unchanged")
+    parser.add_argument("files", nargs="*",
+                        help=f"Names of the raw files in data/{RAW_SCOPUS_DIR} to transform (default: all)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(chunk_size=args.chunk_size, workers=args.workers, cache_size=args.cache_size, force=args.force, files=args.files)
@@ -4,35 +4,114 @@ from pathlib import Path
 # Add the project root to the Python path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
 import pandas as pd
-import numpy as np
 from tqdm import tqdm
 import os
-from utils import get_project_root
-from models.database import DatabaseConnection
-from models.schema import Publication, Journal, Author, Affiliation, JournalCategory
+from utils import get_project_root, get_data_dir
+from table_io import read_table, table_path
+from metrics import record_rows
+from models.database import DatabaseConnection, get_load_mode
+from models.queries import record_load
+from models.schema import (Publication, Authorship, Journal, Author, Affiliation, JournalCategory, LoadState,
+                           UniversityPublicationCount, CityPublicationCount,
+                           create_indexes, create_year_partitions, drop_indexes, is_partitioned)
 from dotenv import load_dotenv
-from sqlalchemy import inspect
+from sqlalchemy import inspect, select, text, BigInteger, Float, Integer, String
+
+# Postgres loading methods: COPY FROM STDIN, or ORM objects saved in bulk
+LOAD_METHODS = ("copy", "orm")
+COPY_CHUNK_SIZE = 100_000
+# NULL marker of the COPY CSV stream, so NULLs and empty strings stay distinct
+COPY_NULL = r"\N"
+
+# Nullable dtype the values of each column type are cast to, checked in order
+COLUMN_DTYPES = [(BigInteger, "Int64"), (Integer, "Int64"), (Float, "Float64"), (String, "string")]
+# Text standing for a missing value in the tables
+MISSING_STRINGS = ["NaN", "nan"]
+
+# Partition key of the publications without a year
+NULL_PARTITION = "null"
+
+# Dimension tables loaded together, each wave after the tables its foreign keys reference
+DIMENSION_WAVES = [
+    [("journals", Journal), ("affiliations", Affiliation)],
+    [("journal_categories", JournalCategory), ("authors", Author)],
+]
+
+# Dimension tables keyed by a surrogate id renumbered on every build, replaced
+# whole rather than upserted: upserting them on an id that now stands for
+# another row would mix old and new rows
+REPLACED_DIMENSIONS = {"journal_categories"}
+
+# Pre-aggregated tables of data/analytics, rebuilt whole on every load
+ANALYTICS_TABLES = [
+    ("publication_counts_by_university", UniversityPublicationCount),
+    ("publication_counts_by_city", CityPublicationCount),
+]
 
 def get_required_columns(table_class):
     """Get required (non-nullable) columns from SQLAlchemy model"""
     inspector = inspect(table_class)
     return {col.key for col in inspector.columns if not col.nullable}
 
+def normalize_column_name(name):
+    """Normalize a column name for matching: lowercase, underscores for spaces"""
+    return name.lower().replace(' ', '_')
+
+def get_column_map(table_class):
+    """Map the normalized key, name and attribute name of every column to the column key"""
+    column_map = {}
+    for prop in inspect(table_class).column_attrs:
+        column = prop.columns[0]
+        for name in (column.key, column.name, prop.key):
+            column_map[normalize_column_name(name)] = column.key
+    return column_map
+
+def get_attribute_names(table_class):
+    """Map every column key to the name of its model attribute"""
+    return {prop.columns[0].key: prop.key for prop in inspect(table_class).column_attrs}
+
+@lru_cache(maxsize=None)
+def get_conversion_plan(table_class):
+    """Map every column key of a table to the nullable dtype of its column type"""
+    plan = {}
+    for column in inspect(table_class).columns:
+        for column_type, dtype in COLUMN_DTYPES:
+            if isinstance(column.type, column_type):
+                plan[column.key] = dtype
+                break
+    return plan
+
+def convert_column(series, dtype):
+    """Cast a column to a nullable dtype, with missing value strings as NA"""
+    if not pd.api.types.is_numeric_dtype(series.dtype):
+        series = series.astype("string")
+        series = series.mask(series.isin(MISSING_STRINGS))
+    if dtype != "string":
+        series = pd.to_numeric(series)
+    return series.astype(dtype)
+
 def clean_data(df, table_class):
-    """Clean data and ensure required columns have values"""
-    # Normalize column names to match schema
-    df.columns = [col.lower() for col in df.columns]
-    df = df.replace({np.nan: None, 'NaN': None, 'nan': None})
+    """Clean data and ensure required columns have values
     
+    Every column is cast to the nullable dtype of its schema column, so
+    missing values are pd.NA.
+    """
     # Get required columns
     required_cols = get_required_columns(table_class)
     
-    # Get column mappings from schema
-    column_map = {c.key.lower(): c.key for c in table_class.__table__.columns}
+    # Map column names to the column keys of the schema, whether the table
+    # names them like the column, its key or its model attribute
+    column_map = get_column_map(table_class)
+    df = df.set_axis([column_map.get(normalize_column_name(col), col) for col in df.columns], axis=1)
     
-    # Map column names
-    df.columns = [column_map.get(col.lower(), col) for col in df.columns]
+    plan = get_conversion_plan(table_class)
+    df = pd.DataFrame({col: convert_column(df[col], plan[col]) if col in plan else df[col] for col in df.columns})
     
     # Ensure required columns have values
     for col in required_cols:
@@ -48,14 +127,56 @@ def clean_data(df, table_class):
     
     return df
 
-def load_to_warehouse(df, table_class, session, db_type, chunk_size=1000):
-    """Load data to warehouse"""
+def to_records(df):
+    """Convert cleaned rows to dicts of Python values, None for missing ones, which the drivers can bind"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def copy_to_postgres(df, table_class, session, chunk_size=COPY_CHUNK_SIZE, target=None):
+    """Stream cleaned data into its table (or `target`) with COPY FROM STDIN, one CSV buffer per chunk"""
+    table = table_class.__table__
+    preparer = session.bind.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(table.columns[key].name) for key in df.columns)
+    target = target or preparer.format_table(table)
+    sql = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    
+    cursor = session.connection().connection.cursor()
+    total_chunks = len(df) // chunk_size + (1 if len(df) % chunk_size else 0)
+    
+    for i in tqdm(range(0, len(df), chunk_size), total=total_chunks, desc=f"Copying {table.name}"):
+        buffer = io.StringIO()
+        df.iloc[i:i + chunk_size].to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+
+def load_to_warehouse(df, table_class, session, db_type, chunk_size=1000, method=None):
+    """Load data to warehouse
+    
+    On Postgres, `method` is "copy" (COPY FROM STDIN) or "orm" (bulk saved ORM
+    objects), by default $POSTGRES_LOAD_METHOD or "copy".
+    """
     table_name = table_class.__tablename__
     total_chunks = len(df) // chunk_size + (1 if len(df) % chunk_size else 0)
+    if method is None:
+        method = os.getenv("POSTGRES_LOAD_METHOD", "copy")
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Unsupported load method: {method}")
     
     # Clean data before chunking
     df = clean_data(df, table_class)
     
+    if db_type == "postgres" and method == "copy":
+        try:
+            copy_to_postgres(df, table_class, session)
+            session.commit()
+        except Exception as e:
+            print(f"\n Error copying {table_name}: {str(e)}")
+            print("\nColumns in data:", list(df.columns))
+            session.rollback()
+            raise
+        return
+    
+    attribute_names = get_attribute_names(table_class)
+    
     for i in tqdm(range(0, len(df), chunk_size), total=total_chunks, desc=f"Loading {table_name}"):
         chunk = df.iloc[i:i + chunk_size].copy()
         
@@ -63,10 +184,10 @@ def load_to_warehouse(df, table_class, session, db_type, chunk_size=1000):
             if db_type == "snowflake":
                 # For Snowflake, use SQLAlchemy Core
                 table = table_class.__table__
-                session.execute(table.insert(), chunk.to_dict('records'))
+                session.execute(table.insert(), to_records(chunk))
             else:
                 # For PostgreSQL, use bulk_save_objects
-                records = chunk.to_dict('records')
+                records = to_records(chunk.rename(columns=attribute_names))
                 instances = [table_class(**record) for record in records]
                 session.bulk_save_objects(instances)
             
@@ -80,12 +201,175 @@ def load_to_warehouse(df, table_class, session, db_type, chunk_size=1000):
             session.rollback()
             raise
 
+def upsert_to_postgres(df, table_class, session):
+    """Insert or update rows by primary key
+
+    The rows are copied into a temporary staging table, then merged into the
+    table with INSERT ... ON CONFLICT DO UPDATE.
+    """
+    table = table_class.__table__
+    preparer = session.bind.dialect.identifier_preparer
+    target = preparer.format_table(table)
+    staging = preparer.quote(f"staging_{table.name}")
+    
+    # A row can only be upserted once per statement
+    key_columns = [column.key for column in table.primary_key.columns]
+    df = df.drop_duplicates(subset=key_columns, keep='first')
+    
+    session.execute(text(f"CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP"))
+    copy_to_postgres(df, table_class, session, target=staging)
+    
+    columns = [preparer.quote(table.columns[key].name) for key in df.columns]
+    keys = [preparer.quote(column.name) for column in table.primary_key.columns]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in keys)
+    session.execute(text(
+        f"INSERT INTO {target} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {staging} "
+        f"ON CONFLICT ({', '.join(keys)}) DO " + (f"UPDATE SET {updates}" if updates else "NOTHING")
+    ))
+
+def upsert_to_warehouse(df, table_class, session, db_type):
+    """Upsert a dimension table by key (incremental loads, PostgreSQL only)"""
+    if db_type != "postgres":
+        raise ValueError(f"Incremental loading is not supported on {db_type}")
+    
+    table_name = table_class.__tablename__
+    df = clean_data(df, table_class)
+    
+    try:
+        upsert_to_postgres(df, table_class, session)
+        session.commit()
+        print(f"Upserted {len(df):,} rows into {table_name}")
+    except Exception as e:
+        print(f"\n Error upserting {table_name}: {str(e)}")
+        session.rollback()
+        raise
+
+def replace_table(df, table_class, session, db_type):
+    """Replace all rows of a table, for the small tables rebuilt on every run"""
+    session.execute(table_class.__table__.delete())
+    load_to_warehouse(df, table_class, session, db_type)
+
+def partition_checksum(*dfs):
+    """SHA-256 of the rows of a partition's tables, in order"""
+    digest = hashlib.sha256()
+    for df in dfs:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def get_load_workers(db):
+    """Get the number of tables or ranges loaded at the same time, $WAREHOUSE_LOAD_WORKERS or the pool size"""
+    return max(1, int(os.getenv("WAREHOUSE_LOAD_WORKERS", db.pool_size or 1)))
+
+def load_in_session(db, load, df, table_class, db_type):
+    """Load a table with its own session, and so its own pooled connection"""
+    session = db.Session()
+    try:
+        load(df, table_class, session, db_type)
+    finally:
+        session.close()
+
+def load_concurrently(db, jobs, workers):
+    """Run (load function, data, table class, db type) jobs at the same time, each on its own connection
+
+    Waits for every job and raises the first error.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(load_in_session, db, *job) for job in jobs]
+        for future in futures:
+            future.result()
+
+def split_ranges(df, count):
+    """Split a table into at most `count` contiguous row ranges"""
+    size = -(-len(df) // max(count, 1))
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)] if len(df) else []
+
+def load_publication_years(publications, authorships, db, db_type, workers=1):
+    """Replace the Year partitions of the publications whose rows changed since they were loaded
+
+    A partition holds the publications of a year and their authorships. It
+    is deleted and loaded again when its checksum differs from the one
+    recorded in load_state, and deleted when its year is gone. Untouched
+    years are left alone. The rows of the changed years are split into
+    `workers` ranges loaded in parallel, and a year is only recorded in
+    load_state once all of them are loaded, so a failed load is retried on
+    the next run. Returns the number of rows loaded.
+    """
+    table_name = Publication.__tablename__
+    session = db.Session()
+    try:
+        loaded = {
+            state.partition_key: state.checksum
+            for state in session.query(LoadState).filter(LoadState.table_name == table_name)
+        }
+        
+        partition_keys = publications["Year"].astype("string").fillna(NULL_PARTITION)
+        partitions = dict(list(publications.groupby(partition_keys, sort=True)))
+        
+        # Authorships belong to the partition of their publication
+        publication_keys = pd.Series(partition_keys.to_numpy(), index=publications["EID"].to_numpy())
+        authorship_keys = authorships["EID"].map(publication_keys).fillna(NULL_PARTITION)
+        authorship_partitions = dict(list(authorships.groupby(authorship_keys, sort=True)))
+        empty_authorships = authorships.iloc[:0]
+        
+        checksums = {
+            key: partition_checksum(partition, authorship_partitions.get(key, empty_authorships))
+            for key, partition in partitions.items()
+        }
+        
+        changed = []
+        for partition_key in sorted(set(loaded) | set(partitions)):
+            if loaded.get(partition_key) == checksums.get(partition_key):
+                print(f"Keeping {table_name} year {partition_key}: unchanged")
+                continue
+            
+            if partition_key not in partitions:
+                print(f"Removing {table_name} year {partition_key}: no longer in the data")
+            else:
+                print(f"Loading {table_name} year {partition_key}: " + ("new" if partition_key not in loaded else "changed"))
+            changed.append(partition_key)
+            
+            # Remove the year's previous rows before its new ones are loaded
+            year_filter = Publication.Year.is_(None) if partition_key == NULL_PARTITION else Publication.Year == int(partition_key)
+            session.execute(Authorship.__table__.delete().where(
+                Authorship.EID.in_(select(Publication.EID).where(year_filter))))
+            session.execute(Publication.__table__.delete().where(year_filter))
+            session.query(LoadState).filter(LoadState.table_name == table_name,
+                                            LoadState.partition_key == partition_key).delete()
+        
+        # A partitioned table needs the partitions of its new years
+        if db_type == "postgres" and is_partitioned(session.connection(), table_name):
+            create_year_partitions(session.connection(),
+                                   [int(key) for key in changed if key in partitions and key != NULL_PARTITION])
+        session.commit()
+        
+        new_keys = [key for key in changed if key in partitions]
+        if not new_keys:
+            return 0
+        
+        rows = pd.concat([partitions[key] for key in new_keys])
+        authorship_rows = pd.concat([authorship_partitions.get(key, empty_authorships) for key in new_keys])
+        load_concurrently(db, [(load_to_warehouse, rows_range, Publication, db_type)
+                               for rows_range in split_ranges(rows, workers)], workers)
+        load_concurrently(db, [(load_to_warehouse, rows_range, Authorship, db_type)
+                               for rows_range in split_ranges(authorship_rows, workers)], workers)
+        
+        for partition_key in changed:
+            if partition_key in partitions:
+                session.add(LoadState(table_name=table_name, partition_key=partition_key,
+                                      checksum=checksums[partition_key], loaded_at=datetime.now()))
+        session.commit()
+        return len(rows) + len(authorship_rows)
+    finally:
+        session.close()
+
 def main(is_airflow=False):
     # Get paths
     project_root = get_project_root()
     models_dir = project_root / "models"
-    dimensions_dir = project_root / "data/dimensions"
-    fact_dir = project_root / "data/fact"
+    data_dir = get_data_dir()
+    dimensions_dir = data_dir / "dimensions"
+    fact_dir = data_dir / "fact"
+    analytics_dir = data_dir / "analytics"
     
     # Load environment variables
     load_dotenv(models_dir / '.env')
@@ -94,39 +378,81 @@ def main(is_airflow=False):
     print(f"\nLoading data to '{db_type.upper()}' database...")
     
     try:
-        # Read all tables with string handling for all columns
+        # Read all tables with the types of their schema
         print("Reading data files...")
-        authors = pd.read_csv(dimensions_dir / "authors.csv", dtype=str)
-        affiliations = pd.read_csv(dimensions_dir / "affiliations.csv", dtype=str)
-        journals = pd.read_csv(dimensions_dir / "journals.csv", dtype=str)
-        journal_categories = pd.read_csv(dimensions_dir / "journal_categories.csv", dtype=str)
-        publications = pd.read_csv(fact_dir / "publications_fact.csv", dtype=str)
+        authors = read_table(table_path(dimensions_dir, "authors"), "authors")
+        affiliations = read_table(table_path(dimensions_dir, "affiliations"), "affiliations")
+        journals = read_table(table_path(dimensions_dir, "journals"), "journals")
+        journal_categories = read_table(table_path(dimensions_dir, "journal_categories"), "journal_categories")
+        publications = read_table(table_path(fact_dir, "publications_fact"), "publications_fact")
+        authorships = read_table(table_path(fact_dir, "authorships"), "authorships")
+        analytics = {name: read_table(table_path(analytics_dir, name), name) for name, _ in ANALYTICS_TABLES}
         
         # Connect to database
         print("Connecting to database...")
         db = DatabaseConnection(is_airflow=is_airflow)
         db.connect()
-        session = db.Session()
+        workers = get_load_workers(db)
+        dimensions = {
+            "journals": journals,
+            "journal_categories": journal_categories,
+            "affiliations": affiliations,
+            "authors": authors,
+        }
+        
+        # Full loads insert into the freshly created tables, incremental loads
+        # upsert the dimensions into the existing ones, except those replaced whole
+        load_mode = get_load_mode()
+        load_dimension = upsert_to_warehouse if load_mode == "incremental" else load_to_warehouse
+        print(f"Load mode: {load_mode}, {workers} concurrent loads")
+        
+        # A full load drops the indexes and builds them once all rows are in,
+        # instead of updating them on every insert
+        defer_indexes = db_type == "postgres" and load_mode == "full"
         
         try:
-            # Load dimension tables
-            print("\nLoading dimension tables...")
-            load_to_warehouse(journals, Journal, session, db_type)
-            load_to_warehouse(journal_categories, JournalCategory, session, db_type)
-            load_to_warehouse(affiliations, Affiliation, session, db_type)
-            load_to_warehouse(authors, Author, session, db_type)
+            try:
+                if defer_indexes:
+                    with db.engine.begin() as connection:
+                        drop_indexes(connection)
+                
+                # Load dimension tables, the independent ones at the same time,
+                # together with the analytics tables, which reference none
+                print("\nLoading dimension and analytics tables...")
+                for i, wave in enumerate(DIMENSION_WAVES):
+                    jobs = [(replace_table if name in REPLACED_DIMENSIONS else load_dimension, dimensions[name], table_class, db_type)
+                            for name, table_class in wave]
+                    if i == 0:
+                        jobs += [(replace_table, analytics[name], table_class, db_type) for name, table_class in ANALYTICS_TABLES]
+                    load_concurrently(db, jobs, workers)
+                
+                # Load fact table, only the years that changed since the last load
+                print("\nLoading fact and authorship tables...")
+                publication_rows = load_publication_years(publications, authorships, db, db_type, workers)
+            finally:
+                # The indexes are only built here, also when the load failed
+                # after dropping them, so the tables are never left without
+                if db_type == "postgres":
+                    print("\nBuilding indexes...")
+                    with db.engine.begin() as connection:
+                        create_indexes(connection)
             
-            # Load fact table
-            print("\nLoading fact table...")
-            load_to_warehouse(publications, Publication, session, db_type)
+            # Drop the query results cached before this load
+            session = db.Session()
+            try:
+                record_load(session)
+            finally:
+                session.close()
             
             print("\n All tables loaded successfully!")
+            dimension_rows = sum(len(df) for df in [*dimensions.values(), *analytics.values()])
+            record_rows(dimension_rows + len(publications) + len(authorships), dimension_rows + publication_rows)
             
         except Exception as e:
             print(f"\n Error loading data: {str(e)}")
             raise
         finally:
-            session.close()
+            db.engine.dispose()
             
     except Exception as e:
         print(f"\n Error: {str(e)}")
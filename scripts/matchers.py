@@ -0,0 +1,96 @@
+import re
+
+def compile_priority_pattern(texts, word_boundaries=True):
+    """Compile literal texts, in priority order, into a single alternation
+
+    At a given position the regex engine tries the alternatives in order, so
+    the first one that matches there is the highest priority text starting at
+    that position.
+    """
+    if not texts:
+        return None
+
+    alternation = '|'.join(re.escape(text) for text in texts)
+    if word_boundaries:
+        return re.compile(rf"\b({alternation})\b")
+    return re.compile(f"({alternation})")
+
+def find_best_match(pattern, priority, text):
+    """Return the highest priority text found anywhere in the text, or None
+
+    The search restarts one character after each match rather than at its end,
+    so overlapping candidates are seen too.
+    """
+    if pattern is None:
+        return None
+
+    best = None
+    match = pattern.search(text)
+    while match:
+        found = match.group(1)
+        if best is None or priority[found] < priority[best]:
+            best = found
+            if priority[best] == 0:
+                break
+        match = pattern.search(text, match.start() + 1)
+    return best
+
+class AffiliationMatcher:
+    """Match the variants of one city's affiliations in a single regex scan.
+
+    The variants are compiled once, ordered by priority (mapper key order,
+    then variant order), and the highest priority variant found anywhere wins.
+    This gives the same result as searching each variant in turn.
+    """
+
+    def __init__(self, variants_by_id):
+        # matched text -> first (id, variant) in priority order
+        self.lookup = {}
+        self.priority = {}
+
+        for key, values in variants_by_id.items():
+            for val in values:
+                if val in self.lookup:
+                    continue
+                self.lookup[val] = (key, val)
+                self.priority[val] = len(self.priority)
+
+        self.pattern = compile_priority_pattern(list(self.priority))
+
+    def match(self, text):
+        """Return the (id, variant) of the best matching variant in the text"""
+        best = find_best_match(self.pattern, self.priority, text)
+        if best is None:
+            return None, None
+        return self.lookup[best]
+
+class CityIndex:
+    """Resolve the city of an affiliation from the cities mapping.
+
+    The second-to-last comma part is looked up in the mapping by exact match
+    first. Otherwise the first mapping key (in mapping order) contained
+    anywhere in the affiliation wins.
+    """
+
+    def __init__(self, cities_mapping):
+        self.cities_mapping = dict(cities_mapping)
+        # Plain substring tests beat a regex alternation over the ~50 city keys,
+        # so the fallback stays an ordered scan over a prebuilt tuple
+        self.items = tuple(cities_mapping.items())
+
+    def lookup(self, affiliation):
+        """Return the mapped city of a lowercase affiliation, or None"""
+        parts = affiliation.rsplit(',', 2)
+        if len(parts) > 1:
+            city = self.cities_mapping.get(parts[-2].strip())
+            if city is not None:
+                return city
+
+        for key, city in self.items:
+            if key in affiliation:
+                return city
+        return None
+
+def build_affiliation_matchers(variants_by_city):
+    """Compile one matcher per city from an affiliations/universities mapper"""
+    return {city: AffiliationMatcher(variants_by_id) for city, variants_by_id in variants_by_city.items()}
@@ -0,0 +1,135 @@
+import cProfile
+import json
+import os
+import pstats
+import subprocess
+import threading
+import time
+import traceback
+from utils import get_peak_rss_mb, maxrss_to_mb
+
+# File a stage run by run_pipeline in its own process reports its row counts to
+STAGE_METRICS_ENV = "PIPELINE_STAGE_METRICS"
+
+# Row counts of the stage running in the current thread, when run in-process
+_current_stage = threading.local()
+
+# Number of functions kept from each stage profile
+TOP_FUNCTIONS = 25
+
+def record_rows(rows_in, rows_out):
+    """Report the rows a stage read and wrote to run_pipeline
+
+    Does nothing when the stage is run on its own.
+    """
+    rows = getattr(_current_stage, "rows", None)
+    if rows is not None:
+        rows.update(rows_in=int(rows_in), rows_out=int(rows_out))
+        return
+
+    path = os.getenv(STAGE_METRICS_ENV)
+    if not path:
+        return
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"rows_in": int(rows_in), "rows_out": int(rows_out)}, f)
+
+def read_rows(path):
+    """Read the rows reported by a stage, or None for both if it reported nothing"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None, None
+    return rows.get("rows_in"), rows.get("rows_out")
+
+def run_measured(command, env=None, cwd=None, stdout=None):
+    """Run a command in a child process and measure it
+
+    Returns the exit code and the wall time, CPU time and peak RSS of the
+    child, including the worker processes it waited for. On Linux, the peak
+    RSS of the child starts at the peak RSS of this process, so measure from
+    a process that has not loaded more than the command will.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, cwd=cwd, stdout=stdout)
+
+    if not hasattr(os, "wait4"):  # Windows
+        returncode = process.wait()
+        return returncode, {"wall_s": round(time.perf_counter() - start, 3), "cpu_s": None, "peak_rss_mb": None}
+
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    # Let Popen know the child is gone so it does not wait for it again
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    return process.returncode, {
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_mb": round(maxrss_to_mb(usage.ru_maxrss), 1),
+    }
+
+def run_in_thread(func, profile_path=None):
+    """Call a stage function in the current thread and measure it
+
+    Returns whether it succeeded, its wall time, the CPU time of this thread,
+    the peak RSS of the whole process so far, and the rows it recorded.
+    """
+    _current_stage.rows = {}
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    succeeded = True
+
+    try:
+        if profile_path:
+            # A profiler only sees the thread it was enabled in
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(func)
+            finally:
+                profiler.dump_stats(str(profile_path))
+        else:
+            func()
+    except (Exception, SystemExit):
+        traceback.print_exc()
+        succeeded = False
+    finally:
+        rows = _current_stage.rows
+        _current_stage.rows = None
+
+    return succeeded, {
+        "wall_s": round(time.perf_counter() - start, 3),
+        "cpu_s": round(time.thread_time() - cpu_start, 3),
+        "peak_rss_mb": round(get_peak_rss_mb(), 1),
+    }, (rows.get("rows_in"), rows.get("rows_out"))
+
+def rows_per_second(rows, seconds):
+    if rows is None or not seconds:
+        return None
+    return round(rows / seconds, 1)
+
+def summarize_profile(profile_path, limit=TOP_FUNCTIONS):
+    """List the functions of a cProfile output with the most cumulative time"""
+    stats = pstats.Stats(str(profile_path))
+    functions = []
+    for (file_name, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        # Skip the import machinery, which otherwise tops every short stage
+        if file_name.startswith("<frozen importlib"):
+            continue
+        functions.append({
+            "function": name,
+            "file": os.path.basename(file_name),
+            "line": line,
+            "calls": calls,
+            "total_s": round(total, 4),
+            "cumulative_s": round(cumulative, 4),
+        })
+
+    functions.sort(key=lambda function: function["cumulative_s"], reverse=True)
+    return functions[:limit]
+
+def write_metrics(document, path):
+    """Write a run's metrics document as JSON"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
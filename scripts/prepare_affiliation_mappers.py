@@ -1,29 +1,11 @@
 import json
 import pandas as pd
-import unicodedata
-import re
 from collections import defaultdict
 from pathlib import Path
 import os
-from utils import get_project_root, create_directories
-
-def normalize_digits(affiliation):
-    """Normalize numerical representations in text"""
-    patterns = {
-        r'\b(first|1st|1er|i)\b': '1',  # Variations of 1
-        r'\b(second|2nd|ii)\b': '2',    # Variations of 2
-        r'\b(fifth|5th|v)\b': '5'       # Variations of 5
-    }
-    
-    normalized_affiliation = affiliation
-    for pattern, replacement in patterns.items():
-        normalized_affiliation = re.sub(pattern, replacement, normalized_affiliation)
-    return normalized_affiliation
-
-def remove_accents(text):
-    """Remove accents from text"""
-    normalized_text = unicodedata.normalize('NFKD', text)
-    return ''.join(char for char in normalized_text if not unicodedata.combining(char))
+from utils import get_project_root, get_data_dir, create_directories
+from metrics import record_rows
+from text_normalization import remove_accents_series, normalize_digits_series
 
 def generate_en_affiliations_variations(affiliation_en):
     """Generate English variations of affiliation names"""
@@ -89,22 +71,18 @@ def prepare_affiliation_mappers(affiliations_df):
     affiliations_by_city = defaultdict(lambda: defaultdict(list))
     universities_by_city = defaultdict(lambda: defaultdict(list))
 
-    for _, row in affiliations_df.iterrows():
-        # id
-        id = row['id']
-        # abbreviation
-        abbreviation = row['Abbreviation'].strip().lower()
-        # affiliation_en
-        affiliation_en = row['Affiliation En Name'].strip().lower()
-        affiliation_en = normalize_digits(affiliation_en)
-        # affiliation_fr
-        affiliation_fr = row['Affiliation'].strip().lower()
-        affiliation_fr = remove_accents(affiliation_fr)
-        affiliation_fr = normalize_digits(affiliation_fr)
-        # city
-        city = row['City'].strip()
-
-        if row['Abbreviation'][0] == 'U':
+    # Normalize the name columns in bulk, with the same normalization the ETL applies
+    abbreviations = affiliations_df['Abbreviation'].str.strip().str.lower()
+    affiliations_en = normalize_digits_series(affiliations_df['Affiliation En Name'].str.strip().str.lower())
+    affiliations_fr = normalize_digits_series(remove_accents_series(affiliations_df['Affiliation'].str.strip().str.lower()))
+    cities = affiliations_df['City'].str.strip()
+
+    rows = zip(
+        affiliations_df['id'].tolist(), affiliations_df['Abbreviation'].tolist(), abbreviations.tolist(),
+        affiliations_en.tolist(), affiliations_fr.tolist(), cities.tolist(),
+    )
+    for id, raw_abbreviation, abbreviation, affiliation_en, affiliation_fr, city in rows:
+        if raw_abbreviation[0] == 'U':
             # University
             universities_by_city[city][id].append(abbreviation)
             universities_by_city[city][id].append(affiliation_fr)
@@ -133,7 +111,7 @@ def main():
     # Read and update affiliations data
     print("Reading affiliations data...")
     project_root = get_project_root()
-    affiliations_df = pd.read_csv(project_root / "data/transformed/affiliations.csv")
+    affiliations_df = pd.read_csv(get_data_dir() / "transformed/affiliations.csv")
     affiliations_df = update_affiliation(affiliations_df)
     
     # Prepare mappers
@@ -149,6 +127,7 @@ def main():
         json.dump(universities_by_city, f, ensure_ascii=False, indent=4)
     
     print("Mappers saved successfully!")
+    record_rows(len(affiliations_df), sum(len(affiliations) for affiliations in affiliations_by_city.values()))
 
 if __name__ == "__main__":
     main()
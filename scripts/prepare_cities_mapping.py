@@ -3,14 +3,12 @@ import json
 from unidecode import unidecode
 from pathlib import Path
 import os
-from utils import get_project_root, create_directories
+from utils import get_project_root, get_data_dir, create_directories
+from metrics import record_rows
 
 def prepare_cities_mapping():
-    # Get project root
-    project_root = get_project_root()
-    
     # Read affiliations data
-    affiliations_df = pd.read_csv(project_root / "data/raw/Universities-Affiliations/Moroccan-Affiliations.csv")
+    affiliations_df = pd.read_csv(get_data_dir() / "raw/Universities-Affiliations/Moroccan-Affiliations.csv")
     
     # Get unique French city names
     french_city_names = affiliations_df['City'].apply(lambda x: x.strip()).unique().tolist()
@@ -58,6 +56,7 @@ def main():
         json.dump(cities_mapping, json_file, ensure_ascii=False, indent=4)
     
     print(f"Cities mapping saved to {output_path}")
+    record_rows(len(set(cities_mapping.values())), len(cities_mapping))
 
 if __name__ == "__main__":
     main()
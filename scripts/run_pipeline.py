@@ -1,61 +1,219 @@
-import subprocess
+import argparse
+import importlib
 import sys
 import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
 from utils import get_project_root, create_directories
+from metrics import (STAGE_METRICS_ENV, read_rows, rows_per_second, run_in_thread, run_measured,
+                     summarize_profile, write_metrics)
 from dotenv import load_dotenv
 
-def run_script(script_path):
-    """Run a Python script and handle any errors"""
-    print("="*50)
-    print(f"Running {script_path}...")
-    print("="*50)
-    
-    try:
-        result = subprocess.run([sys.executable, script_path], check=True)
-        print(f"\nSuccessfully completed {script_path}\n")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\nError running {script_path}:")
-        print(e)
-        return False
-
-def main():
+# Pipeline stages in a valid run order: (stage, script, function, stages it depends on)
+STAGES = [
+    # Phase 1: Data Preparation
+    ("translate_affiliations", "scripts/translate_affiliations.py", "main", []),           # Translate French affiliations to English
+    ("prepare_cities_mapping", "scripts/prepare_cities_mapping.py", "main", []),           # Create cities mapping
+    ("transform_journal", "scripts/transform_journal.py", "main", []),                     # Transform journal metadata
+    ("prepare_affiliation_mappers", "scripts/prepare_affiliation_mappers.py", "main",      # Create affiliation mappings
+     ["translate_affiliations"]),
+    ("etl", "scripts/etl.py", "main",                                                      # Run main ETL process
+     ["prepare_cities_mapping", "prepare_affiliation_mappers"]),
+
+    # Phase 2: Data Integration
+    ("combine_transformed", "scripts/combine_transformed.py", "combine_transformed_files", ["etl"]),
+    ("build_fact_and_dimensions", "scripts/build_fact_and_dimensions.py", "main",
+     ["combine_transformed", "translate_affiliations", "transform_journal"]),
+
+    # Phase 3: Database Operations
+    # The schema is only dropped and recreated once the tables to load are built
+    ("init_db", "models/init_db.py", "init_database", ["build_fact_and_dimensions"]),
+    ("load_to_warehouse", "scripts/load_to_warehouse.py", "main", ["build_fact_and_dimensions", "init_db"]),
+]
+
+def stage_module(script):
+    """Module name and import directory of a stage script
+
+    The scripts are imported as top-level modules, like they import each other,
+    and models/init_db.py as models.init_db from the project root, so it shares
+    the models.schema and models.database modules the loader imports.
+    """
+    project_root = get_project_root()
+    script_path = project_root / script
+    if script_path.parent == project_root / "scripts":
+        return script_path.stem, script_path.parent
+    return ".".join(script_path.relative_to(project_root).with_suffix("").parts), project_root
+
+def load_stage_function(script, function):
+    """Import a stage's module and return its entry point"""
+    module, import_dir = stage_module(script)
+    if str(import_dir) not in sys.path:
+        sys.path.insert(0, str(import_dir))
+    return getattr(importlib.import_module(module), function)
+
+def run_stage(stage, script, function, run_id, metrics_dir, profile=False, isolated=False):
+    """Run a stage, in this process or in its own, and return its metrics"""
+    print(f"Running {stage}...")
+    profile_path = metrics_dir / f"{run_id}_{stage}.prof" if profile else None
+    if profile:
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+
+    if isolated:
+        script_path = get_project_root() / script
+        command = [sys.executable, str(script_path)]
+        if profile:
+            command = [sys.executable, "-m", "cProfile", "-o", str(profile_path), str(script_path)]
+
+        # The stage reports its row counts to this file through metrics.record_rows
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rows_file = os.path.join(tmp_dir, "rows.json")
+            returncode, usage = run_measured(command, env=dict(os.environ, **{STAGE_METRICS_ENV: rows_file}))
+            rows_in, rows_out = read_rows(rows_file)
+        succeeded = returncode == 0
+    else:
+        succeeded, usage, (rows_in, rows_out) = run_in_thread(
+            lambda: load_stage_function(script, function)(), profile_path)
+
+    metrics = {
+        "stage": stage,
+        "script": script,
+        "status": "success" if succeeded else "failed",
+        **usage,
+        # In-process, concurrent stages share the process, so only the CPU time
+        # of the stage's own thread is measured, without its worker processes
+        "cpu_scope": "process_tree" if isolated else "thread",
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_s": rows_per_second(rows_in, usage["wall_s"]),
+    }
+    if profile_path and profile_path.exists():
+        metrics["profile"] = str(profile_path)
+        metrics["top_functions"] = summarize_profile(profile_path)
+
+    if succeeded:
+        print(f"\nSuccessfully completed {stage} in {usage['wall_s']:.1f}s\n")
+    else:
+        print(f"\nError running {stage}")
+    return metrics
+
+def run_stages(run_id, metrics_dir, profile=False, isolated=False, max_parallel=None):
+    """Run every stage once its dependencies succeeded, independent stages concurrently
+
+    Stages depending on a failed stage are skipped. Returns the metrics of
+    every stage by name, in stage order.
+    """
+    start = time.perf_counter()
+    results = {}
+    pending = list(STAGES)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_parallel or len(STAGES)) as executor:
+        while pending or running:
+            for entry in list(pending):
+                stage, script, function, depends_on = entry
+                statuses = [results[dep]["status"] if dep in results else None for dep in depends_on]
+                if any(status in ("failed", "skipped") for status in statuses):
+                    pending.remove(entry)
+                    results[stage] = {"stage": stage, "script": script, "status": "skipped"}
+                elif all(status == "success" for status in statuses):
+                    pending.remove(entry)
+                    started = time.perf_counter() - start
+                    future = executor.submit(run_stage, stage, script, function, run_id, metrics_dir, profile, isolated)
+                    running[future] = (stage, started)
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, started = running.pop(future)
+                results[stage] = {**future.result(), "started_s": round(started, 3),
+                                  "finished_s": round(time.perf_counter() - start, 3)}
+
+    return {stage: results[stage] for stage, *_ in STAGES}
+
+def critical_path(results):
+    """Return the chain of dependent stages with the longest total wall time, and that time"""
+    finish = {}
+    previous = {}
+    for stage, _, _, depends_on in STAGES:
+        if "wall_s" not in results[stage]:
+            continue
+        ran = [dep for dep in depends_on if dep in finish]
+        previous[stage] = max(ran, key=finish.get, default=None)
+        finish[stage] = finish.get(previous[stage], 0) + results[stage]["wall_s"]
+
+    if not finish:
+        return [], 0.0
+
+    stage = max(finish, key=finish.get)
+    path = []
+    while stage:
+        path.append(stage)
+        stage = previous[stage]
+    return path[::-1], round(max(finish.values()), 3)
+
+def print_summary(stages):
+    """Print the metrics of every stage"""
+    print(f"\n{'Stage':30}{'status':>9}{'wall (s)':>10}{'cpu (s)':>10}{'rows in':>12}{'rows out':>12}{'peak MB':>10}")
+    for s in stages:
+        print(f"{s['stage']:30}{s['status']:>9}{s.get('wall_s') or 0:>10.2f}{s.get('cpu_s') or 0:>10.2f}"
+              f"{s.get('rows_in') or 0:>12,}{s.get('rows_out') or 0:>12,}{s.get('peak_rss_mb') or 0:>10.1f}")
+
+def main(profile=False, isolated=False, max_parallel=None, sjr_year=None):
     # Get the project root directory
     project_root = get_project_root()
-    scripts_dir = project_root / "scripts"
     models_dir = project_root / "models"
-    
+    metrics_dir = project_root / "logs/metrics"
+
     # Load environment variables
     load_dotenv(models_dir / '.env')
     db_type = os.getenv("DB_TYPE", "postgres")
     
+    # SJR year the journal dimensions are built from, read by the stages
+    # whether they run in this process or in their own
+    if sjr_year:
+        os.environ["SJR_YEAR"] = sjr_year
+
     # Create all necessary directories
     create_directories()
-    
-    # Define the scripts to run in order
-    scripts = [
-        # Phase 1: Data Preparation
-        scripts_dir / 'translate_affiliations.py',      # Step 1: Translate French affiliations to English
-        scripts_dir / 'prepare_cities_mapping.py',      # Step 2: Create cities mapping
-        scripts_dir / 'prepare_affiliation_mappers.py', # Step 3: Create affiliation mappings
-        scripts_dir / 'transform_journal.py',           # Step 4: Transform journal metadata
-        scripts_dir / 'etl.py',                         # Step 5: Run main ETL process
-        
-        # Phase 2: Data Integration
-        scripts_dir / 'combine_transformed.py',         # Step 6: Combine transformed files
-        scripts_dir / 'build_fact_and_dimensions.py',   # Step 7: Build star schema tables
-        
-        # Phase 3: Database Operations
-        models_dir / 'init_db.py',                      # Step 8: Initialize database schema
-        scripts_dir / 'load_to_warehouse.py'            # Step 9: Load data to database
-    ]
-    
-    # Run each script in sequence
-    for script in scripts:
-        if not run_script(script):
-            print(f"Pipeline failed at {script}")
-            sys.exit(1)
-    
+
+    # One metrics document per run, named after its start time
+    started_at = datetime.now()
+    run_id = started_at.strftime("%Y%m%dT%H%M%S")
+    start = time.perf_counter()
+
+    results = run_stages(run_id, metrics_dir, profile, isolated, max_parallel)
+    path, path_time = critical_path(results)
+    failed = [stage for stage, metrics in results.items() if metrics["status"] == "failed"]
+
+    run = {
+        "run_id": run_id,
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "db_type": db_type,
+        "profile": profile,
+        "isolated": isolated,
+        "status": "failed" if failed else "success",
+        "wall_s": round(time.perf_counter() - start, 3),
+        "stage_time_s": round(sum(metrics.get("wall_s", 0) for metrics in results.values()), 3),
+        "critical_path": path,
+        "critical_path_s": path_time,
+        "stages": list(results.values()),
+    }
+    metrics_path = metrics_dir / f"pipeline_{run_id}.json"
+    write_metrics(run, metrics_path)
+
+    print_summary(run["stages"])
+    print(f"\nCritical path: {' -> '.join(path)} ({path_time:.1f}s)")
+    print(f"Pipeline wall time: {run['wall_s']:.1f}s, sum of stage times: {run['stage_time_s']:.1f}s")
+    print(f"Run metrics saved to {metrics_path}")
+
+    if failed:
+        print(f"Pipeline failed at {', '.join(failed)}")
+        sys.exit(1)
+
     print("\n Complete ETL pipeline executed successfully!")
     print("\nData has been:")
     print("1. Extracted and transformed from source files")
@@ -63,5 +221,19 @@ def main():
     print("3. Organized into star schema structure")
     print(f"4. Loaded into {db_type.upper()} database")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the complete ETL pipeline")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile each stage with cProfile, saving logs/metrics/<run>_<stage>.prof")
+    parser.add_argument("--isolated", action="store_true",
+                        help="Run each stage in its own Python process instead of in this one")
+    parser.add_argument("--max-parallel", type=int, default=None,
+                        help="Stages run at the same time at most, 1 runs them one by one (default: no limit)")
+    parser.add_argument("--sjr-year", default=None,
+                        help="Year suffix of the SJR export to build the journal dimensions from, e.g. 23 "
+                             "(default: $SJR_YEAR or the latest transformed year)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(profile=args.profile, isolated=args.isolated, max_parallel=args.max_parallel, sjr_year=args.sjr_year)
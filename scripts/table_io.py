@@ -0,0 +1,213 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Explicit column types of every intermediate table, in column order.
+# Columns with few distinct values are categoricals, stored as dictionary
+# encoded Parquet columns, and years, affiliation ids and quartiles small integers.
+PUBLICATION_SCHEMA = {
+    "Author ID": "Int64",
+    "Author Name": "string",
+    "Affiliation ID": "Int32",
+    "EID": "string",
+    "Title": "string",
+    "Year": "Int16",
+    "Volume": "string",
+    "Issue": "string",
+    "ISSN": "string",
+    "Document Type": "category",
+    "Source title": "category",
+    "DOI": "string",
+    "Link": "string",
+    "PubMed ID": "string",
+    "Language of Original Document": "category",
+}
+
+TABLE_SCHEMAS = {
+    # data/transformed/transformed_<name> and data/final/combined_publications
+    "transformed": PUBLICATION_SCHEMA,
+    "combined_publications": PUBLICATION_SCHEMA,
+    # data/dimensions
+    "authors": {
+        "id": "Int64",
+        "Name": "string",
+        "affiliation_id": "Int32",
+    },
+    "affiliations": {
+        "id": "Int32",
+        "Affiliation": "string",
+        "Abbreviation": "string",
+        "University": "string",
+        "City": "string",
+    },
+    "journals": {
+        "id": "Int64",
+        "Title": "string",
+        "ISSN": "string",
+        "Rank": "Int64",
+        "SJR": "float64",
+        "Publisher": "string",
+        "Type": "string",
+        "Categories": "string",
+        "Best_Quartile": "Int8",
+    },
+    "journal_categories": {
+        "id": "Int64",
+        "ISSN": "string",
+        "Category": "string",
+        "Quartile": "Int8",
+    },
+    # data/fact
+    "publications_fact": {
+        "EID": "string",
+        "Title": "string",
+        "Year": "Int16",
+        "Document_Type": "category",
+        "Source_Title": "category",
+        "DOI": "string",
+        "Link": "string",
+        "Original_Language": "category",
+        "ISSN": "string",
+        "PubMed_ID": "string",
+        "Volume": "string",
+        "Issue": "string",
+    },
+    "authorships": {
+        "EID": "string",
+        "author_id": "Int64",
+        "affiliation_id": "Int32",
+    },
+    # data/analytics
+    "publication_counts_by_university": {
+        "id": "Int64",
+        "University": "string",
+        "Year": "Int16",
+        "Category": "string",
+        "Document_Type": "string",
+        "publications": "Int64",
+        "authors": "Int64",
+    },
+    "publication_counts_by_city": {
+        "id": "Int64",
+        "City": "string",
+        "Year": "Int16",
+        "Category": "string",
+        "Document_Type": "string",
+        "publications": "Int64",
+        "authors": "Int64",
+    },
+}
+
+COMPRESSION = "zstd"
+
+# Parquet column types of the schema dtypes. Categoricals always use 32 bit
+# dictionary indices, so the row groups of a table written chunk by chunk
+# share one type whatever the number of categories of each chunk.
+ARROW_TYPES = {
+    "Int8": pa.int8(),
+    "Int16": pa.int16(),
+    "Int32": pa.int32(),
+    "Int64": pa.int64(),
+    "float64": pa.float64(),
+    "string": pa.string(),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+}
+
+NUMERIC_DTYPES = ("Int8", "Int16", "Int32", "Int64", "float64")
+
+def export_csv_enabled():
+    """Whether the tables should also be exported as CSV (set EXPORT_CSV=1)"""
+    return os.getenv("EXPORT_CSV", "0").lower() in ("1", "true", "yes")
+
+def table_path(directory, name, suffix=".parquet"):
+    """Get the path of an intermediate table file"""
+    return directory / f"{name}{suffix}"
+
+def apply_schema(df, table):
+    """Select the table's columns in order and cast them to its schema"""
+    schema = TABLE_SCHEMAS[table]
+    df = df[list(schema)].copy()
+
+    for col, dtype in schema.items():
+        if dtype in NUMERIC_DTYPES and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col])
+        df[col] = df[col].astype(dtype)
+
+    return df
+
+def arrow_schema(table):
+    """Get the Parquet schema of a table"""
+    return pa.schema([(col, ARROW_TYPES[dtype]) for col, dtype in TABLE_SCHEMAS[table].items()])
+
+def to_arrow(df, table):
+    """Convert a table cast to its schema to an Arrow table"""
+    return pa.Table.from_pandas(df, schema=arrow_schema(table), preserve_index=False)
+
+def write_table(df, path, table, export_csv=None):
+    """Write a table as compressed Parquet with its schema, and optionally as CSV"""
+    df = apply_schema(df, table)
+    pq.write_table(to_arrow(df, table), path, compression=COMPRESSION)
+
+    if export_csv is None:
+        export_csv = export_csv_enabled()
+    if export_csv:
+        df.to_csv(path.with_suffix(".csv"), index=False)
+
+def read_table(path, table, columns=None):
+    """Read a Parquet table, typed with its schema"""
+    df = pd.read_parquet(path, columns=columns)
+    schema = TABLE_SCHEMAS[table]
+    return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+
+def iter_table(path, table, chunk_size=None):
+    """Read a Parquet table in chunks of `chunk_size` rows, typed with its schema
+
+    Reads the whole table at once when `chunk_size` is not given.
+    """
+    if not chunk_size:
+        yield read_table(path, table)
+        return
+
+    schema = TABLE_SCHEMAS[table]
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        df = batch.to_pandas()
+        yield df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+
+class TableWriter:
+    """Write a table chunk by chunk as Parquet row groups, and optionally as CSV"""
+
+    def __init__(self, path, table, export_csv=None):
+        self.path = path
+        self.table = table
+        self.export_csv = export_csv_enabled() if export_csv is None else export_csv
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        """Append a chunk to the table"""
+        df = apply_schema(df, self.table)
+        arrow_table = to_arrow(df, self.table)
+
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, arrow_table.schema, compression=COMPRESSION)
+        self.writer.write_table(arrow_table)
+
+        if self.export_csv:
+            first = self.rows == 0
+            df.to_csv(self.path.with_suffix(".csv"), mode='w' if first else 'a', header=first, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the file, writing an empty table if no chunk was written"""
+        if self.writer is None:
+            write_table(pd.DataFrame(columns=list(TABLE_SCHEMAS[self.table])), self.path, self.table, self.export_csv)
+        else:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,59 @@
+import re
+import unicodedata
+
+class _CombiningCharacters(dict):
+    """Translation table deleting every combining character (accents left over by NFKD)
+
+    Filled lazily with the characters actually seen: building it for all of
+    Unicode up front costs more than half a second per process.
+    """
+
+    def __missing__(self, code):
+        replacement = None if unicodedata.combining(chr(code)) else code
+        self[code] = replacement
+        return replacement
+
+COMBINING_CHARACTERS = _CombiningCharacters()
+
+# Variations of 1, 2 and 5 rewritten in a single pass
+DIGIT_REPLACEMENTS = {
+    'first': '1', '1st': '1', '1er': '1', 'i': '1',
+    'second': '2', '2nd': '2', 'ii': '2',
+    'fifth': '5', '5th': '5', 'v': '5',
+}
+DIGIT_PATTERN = re.compile(rf"\b({'|'.join(DIGIT_REPLACEMENTS)})\b")
+
+def _replace_digit(match):
+    return DIGIT_REPLACEMENTS[match.group(1)]
+
+def remove_accents(text):
+    """Remove accents from text"""
+    if text.isascii():
+        return text
+    return unicodedata.normalize('NFKD', text).translate(COMBINING_CHARACTERS)
+
+def normalize_digits(affiliation):
+    """Normalize numerical representations in text"""
+    return DIGIT_PATTERN.sub(_replace_digit, affiliation)
+
+def normalize_affiliation(affiliation):
+    """Normalize affiliation text"""
+    affiliation = affiliation.lower()
+    affiliation = remove_accents(affiliation)
+    affiliation = normalize_digits(affiliation)
+    return affiliation
+
+def remove_accents_series(texts):
+    """Remove accents from a Series of texts"""
+    return texts.str.normalize('NFKD').str.translate(COMBINING_CHARACTERS)
+
+def normalize_digits_series(affiliations):
+    """Normalize numerical representations in a Series of texts"""
+    return affiliations.str.replace(DIGIT_PATTERN, _replace_digit, regex=True)
+
+def normalize_affiliation_series(affiliations):
+    """Normalize a Series of affiliation texts"""
+    affiliations = affiliations.str.lower()
+    affiliations = remove_accents_series(affiliations)
+    affiliations = normalize_digits_series(affiliations)
+    return affiliations
@@ -1,58 +1,83 @@
+import argparse
+import re
 import pandas as pd
 from pathlib import Path
-from utils import get_project_root
+from utils import get_data_dir
+from metrics import record_rows
+
+# Quartile indicator following a category, e.g. "Oncology (Q1)", and its quartile number
+QUARTILE_SUFFIX = r"(?s)\(.*"
+QUARTILE = r"\(Q([1-4])\)"
+
+# Yearly SJR exports and the files transformed from them, named after the year
+# of the export: two digits (journal-23.csv) or four (journal-2024.csv)
+SJR_FILE = re.compile(r"journal-(\d{2}|\d{4})\.csv")
+JOURNAL_FILE = re.compile(r"clean_journal_(\d{2}|\d{4})\.csv")
 
 def expand_issn(df):
     """Expand rows with multiple ISSN codes into separate rows"""
-    # Create a list to store new rows
-    expanded_rows = []
-    
-    for _, row in df.iterrows():
-        # Split ISSN codes and remove any whitespace
-        issn_list = [issn.strip() for issn in str(row['Issn']).split(',') if issn.strip()]
-        
-        # Create a new row for each ISSN code
-        for issn in issn_list:
-            new_row = row.copy()
-            new_row['Issn'] = issn
-            expanded_rows.append(new_row)
+    # Split ISSN codes into one row each and remove any whitespace
+    df = df.assign(Issn=df['Issn'].map(str).str.split(',')).explode('Issn')
+    df['Issn'] = df['Issn'].str.strip()
     
-    # Create new dataframe from expanded rows
-    return pd.DataFrame(expanded_rows)
+    return df[df['Issn'] != '']
 
 def expand_categories(df):
-    """Expand categories into separate rows, removing (Qx) quartile indicators"""
-    categories_rows = []
+    """Expand categories into separate rows, moving (Qx) quartile indicators to a Quartile column"""
+    categories = df[['Issn', 'Categories']].dropna(subset=['Categories'])
     
-    for _, row in df.iterrows():
-        if pd.isna(row['Categories']):
-            continue
-            
-        # Split categories and clean them
-        categories = row['Categories'].split(';')
-        for category in categories:
-            # Remove quartile indicator and clean
-            clean_category = category.split('(')[0].strip()
-            if clean_category:
-                categories_rows.append({
-                    'ISSN': row['Issn'],
-                    'Category': clean_category
-                })
+    # Split categories into one row each
+    categories = categories.assign(Category=categories['Categories'].astype(str).str.split(';')).explode('Category')
     
-    return pd.DataFrame(categories_rows)
-
-def main():
-    """Transform the SJR journal CSV file from semicolon to comma separated format"""
-    project_root = get_project_root()
+    # Keep the quartile as a small integer, then remove its indicator and clean
+    categories['Quartile'] = categories['Category'].str.extract(QUARTILE, expand=False).astype('Int8')
+    categories['Category'] = categories['Category'].str.replace(QUARTILE_SUFFIX, '', regex=True).str.strip()
+    categories = categories[categories['Category'] != '']
     
-    # Input and output paths using project root
-    input_file = project_root / "data/raw/sjr/journal-23.csv"
-    output_dir = project_root / "data/transformed"
-    journal_output = output_dir / "clean_journal_23.csv"
-    categories_output = output_dir / "journal_categories_23.csv"
+    return categories.rename(columns={'Issn': 'ISSN'})[['ISSN', 'Category', 'Quartile']].reset_index(drop=True)
 
-    # Create output directory if it doesn't exist
-    output_dir.mkdir(parents=True, exist_ok=True)
+def best_quartile(df, categories_df):
+    """Get the best (lowest) quartile of each journal over its categories"""
+    return df['Issn'].map(categories_df.groupby('ISSN')['Quartile'].min()).astype('Int8')
+
+def sjr_year(path):
+    """Get the year suffix of an SJR export, e.g. '23' for journal-23.csv"""
+    match = SJR_FILE.fullmatch(Path(path).name)
+    if match is None:
+        raise ValueError(f"SJR exports must be named journal-<yy>.csv or journal-<yyyy>.csv, got {Path(path).name}")
+    return match.group(1)
+
+def year_number(year):
+    """Get the full year of a year suffix, for sorting: '23' -> 2023, '2024' -> 2024"""
+    return 2000 + int(year) if len(year) == 2 else int(year)
+
+def journal_files(transformed_dir, year=None):
+    """Get the clean_journal and journal_categories files of an SJR year, the latest one by default"""
+    if year is None:
+        years = []
+        for path in transformed_dir.glob("clean_journal_*.csv"):
+            match = JOURNAL_FILE.fullmatch(path.name)
+            if match and (transformed_dir / f"journal_categories_{match.group(1)}.csv").exists():
+                years.append(match.group(1))
+        if not years:
+            raise FileNotFoundError(f"No transformed SJR journal files found in {transformed_dir}, run transform_journal first")
+        year = max(years, key=year_number)
+
+    journal_file = transformed_dir / f"clean_journal_{year}.csv"
+    categories_file = transformed_dir / f"journal_categories_{year}.csv"
+    for path in (journal_file, categories_file):
+        if not path.exists():
+            raise FileNotFoundError(f"Transformed SJR file {path} not found, run transform_journal for journal-{year}.csv")
+    return journal_file, categories_file
+
+def transform_sjr_file(input_file, output_dir):
+    """Transform one SJR export, writing its clean_journal and journal_categories files
+
+    Returns the number of rows read and the cleaned journals.
+    """
+    year = sjr_year(input_file)
+    journal_output = output_dir / f"clean_journal_{year}.csv"
+    categories_output = output_dir / f"journal_categories_{year}.csv"
 
     # Read the semicolon-separated CSV file
     df = pd.read_csv(input_file, 
@@ -63,6 +88,8 @@ def main():
     # Clean column names
     df.columns = df.columns.str.strip().str.replace(' ', '_').str.replace('.', '')
 
+    rows_in = len(df)
+
     # Clean numeric data
     df['SJR'] = df['SJR'].str.replace(',', '.').astype(float)
     
@@ -74,6 +101,7 @@ def main():
     
     # Create categories DataFrame
     categories_df = expand_categories(df)
+    df['Best_Quartile'] = best_quartile(df, categories_df)
     
     # Save both DataFrames
     df.to_csv(journal_output, 
@@ -88,9 +116,55 @@ def main():
                          encoding='utf-8',
                          quoting=1)  # QUOTE_ALL to handle fields that contain commas
 
-    print(f"\nFile transformed successfully. Output saved to: {journal_output.relative_to(project_root)}")
-    print(f"Categories saved to: {categories_output.relative_to(project_root)}")
-    return df
+    data_dir = output_dir.parent
+    print(f"\nFile transformed successfully. Output saved to: {journal_output.relative_to(data_dir.parent)}")
+    print(f"Categories saved to: {categories_output.relative_to(data_dir.parent)}")
+    return rows_in, df
+
+def main(files=None):
+    """Transform the SJR journal CSV files from semicolon to comma separated format
+
+    Every yearly export data/raw/sjr/journal-<yy>.csv (or the given files) is
+    transformed in one pass, oldest year first, into clean_journal_<yy>.csv
+    and journal_categories_<yy>.csv. Returns the cleaned journals by year.
+    """
+    # Input and output paths using the data directory
+    data_dir = get_data_dir()
+    if files:
+        input_files = [Path(f) for f in files]
+    else:
+        input_files = []
+        for path in (data_dir / "raw/sjr").glob("journal-*.csv"):
+            if SJR_FILE.fullmatch(path.name):
+                input_files.append(path)
+            else:
+                print(f"Skipping {path.name}: not named journal-<yy>.csv or journal-<yyyy>.csv")
+    
+    # Oldest year first, e.g. journal-23.csv before journal-2024.csv
+    input_files.sort(key=lambda path: year_number(sjr_year(path)))
+    output_dir = data_dir / "transformed"
+
+    if not input_files:
+        print("No SJR journal files found in the raw/sjr directory!")
+        return {}
+
+    # Create output directory if it doesn't exist
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    journals = {}
+    rows_in = 0
+    for input_file in input_files:
+        rows, journals[sjr_year(input_file)] = transform_sjr_file(input_file, output_dir)
+        rows_in += rows
+
+    record_rows(rows_in, sum(len(df) for df in journals.values()))
+    return journals
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Transform the SJR journal exports")
+    parser.add_argument("files", nargs="*",
+                        help="SJR exports named journal-<yy>.csv (default: every data/raw/sjr/journal-*.csv)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    main(parse_args().files)
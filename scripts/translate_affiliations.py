@@ -1,5 +1,6 @@
 import pandas as pd
-from utils import get_project_root, create_directories
+from utils import get_data_dir, create_directories
+from metrics import record_rows
 
 # Dictionary of French to English translations
 AFFILIATION_TRANSLATIONS = {
@@ -92,11 +93,11 @@ def translate_affiliation(affiliation):
 def main():
     # Create necessary directories
     create_directories()
-    project_root = get_project_root()
+    data_dir = get_data_dir()
     
     # Read the affiliations data
     print("Reading affiliations data...")
-    input_path = project_root / "data/raw/Universities-Affiliations/Moroccan-Affiliations.csv"
+    input_path = data_dir / "raw/Universities-Affiliations/Moroccan-Affiliations.csv"
     affiliations_df = pd.read_csv(input_path)
     
     # Clean and translate affiliations
@@ -111,10 +112,11 @@ def main():
 
     # Save the translated data
     print("Saving translated data...")
-    output_path = project_root / "data/transformed/affiliations.csv"
+    output_path = data_dir / "transformed/affiliations.csv"
     affiliations_df.to_csv(output_path, index=False)
     
     print(f"Translations saved to {output_path}")
+    record_rows(len(affiliations_df), len(affiliations_df))
 
 if __name__ == "__main__":
     main()
@@ -1,26 +1,40 @@
 from pathlib import Path
+import hashlib
 import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 def get_project_root():
     """Get the project root directory from the script location"""
     current_dir = Path(os.path.dirname(os.path.abspath(__file__)))
     return current_dir.parent
 
+def get_data_dir():
+    """Get the data directory, which the PIPELINE_DATA_DIR environment variable can override"""
+    data_dir = os.getenv("PIPELINE_DATA_DIR")
+    return Path(data_dir) if data_dir else get_project_root() / "data"
+
 def create_directories():
     """Create all necessary directories for the project if they don't exist"""
     project_root = get_project_root()
+    data_dir = get_data_dir()
     
     # List of directories to create
     directories = [
         # Data directories
-        project_root / "data/transformed",  # Transformed source files
-        project_root / "data/final",        # Combined data
-        project_root / "data/fact",         # Fact tables
-        project_root / "data/dimensions",   # Dimension tables
+        data_dir / "transformed",           # Transformed source files
+        data_dir / "final",                 # Combined data
+        data_dir / "fact",                  # Fact tables
+        data_dir / "dimensions",            # Dimension tables
+        data_dir / "analytics",             # Pre-aggregated analytics tables
         
         # Support directories
         project_root / "mappers",           # Mapping files
-        # project_root / "logs"               # Log files (for future use)
+        project_root / "logs/metrics",      # Pipeline run metrics and profiles
     ]
     
     # Create each directory if it doesn't exist
@@ -28,3 +42,26 @@ def create_directories():
         directory.mkdir(parents=True, exist_ok=True)
         
     print(" Project directories created successfully")
+
+def get_peak_rss_mb(children=False):
+    """Get the peak resident memory of the current process (or its largest child) in MB"""
+    if resource is None:
+        return float('nan')
+    
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return maxrss_to_mb(resource.getrusage(who).ru_maxrss)
+
+def maxrss_to_mb(maxrss):
+    """Convert a ru_maxrss value to MB"""
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == 'darwin':
+        return maxrss / (1024 * 1024)
+    return maxrss / 1024
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Get the SHA-256 hex digest of a file's content, read block by block"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,62 @@
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+# Add the scripts and benchmarks directories and the project root to the Python path
+project_dir = Path(__file__).resolve().parent.parent
+sys.path.extend([str(project_dir / "scripts"), str(project_dir / "benchmarks"), str(project_dir)])
+
+from models.database import DatabaseConnection
+from models.schema import Base
+
+# Demo Scopus export the transformations are checked on
+RAW_FILE = project_dir / "data/raw/scopus-demo/2021.csv"
+
+@pytest.fixture(scope="session")
+def raw_affiliations():
+    """Every distinct affiliation of the demo export, sorted"""
+    affiliations = pd.read_csv(RAW_FILE, dtype=str)["Affiliations"].dropna().str.split(';').explode()
+    return sorted(affiliations[affiliations != ""].unique())
+
+# Scratch schema the warehouse tests create their tables in
+TEST_SCHEMA = "scopus_tests"
+
+@pytest.fixture
+def warehouse():
+    """Connection to the local PostgreSQL warehouse, working in a scratch schema
+
+    Every pooled connection uses TEST_SCHEMA, created empty with all tables
+    and dropped afterwards, so the tests never touch the warehouse tables.
+    The tests are skipped when no PostgreSQL database is reachable.
+    """
+    if os.getenv("DB_TYPE", "postgres") != "postgres":
+        pytest.skip("The warehouse tests need PostgreSQL")
+
+    db = DatabaseConnection()
+    db.connect()
+
+    @event.listens_for(db.engine, "connect")
+    def use_test_schema(dbapi_connection, _):
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {TEST_SCHEMA}")
+
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+            connection.execute(text(f"CREATE SCHEMA {TEST_SCHEMA}"))
+    except OperationalError:
+        db.engine.dispose()
+        pytest.skip("No local PostgreSQL warehouse")
+
+    Base.metadata.create_all(db.engine)
+    try:
+        yield db
+    finally:
+        with db.engine.begin() as connection:
+            connection.execute(text(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE"))
+        db.engine.dispose()
@@ -0,0 +1,103 @@
+import pandas as pd
+from build_fact_and_dimensions import (CUBE_ALL, build_authorship_table, build_fact_table, build_journal_categories,
+                                       build_journal_dimension, build_publication_cube)
+
+def journals(best_quartile=True):
+    df = pd.DataFrame({
+        "Rank": [1, 2, 3],
+        "Sourceid": [1000, 1001, 1002],
+        "Title": ["A", "B", "C"],
+        "Type": "journal",
+        "Issn": ["01677322", "15424863", "1234567X"],
+        "SJR": [1.5, 0.5, None],
+        "Publisher": "Pub",
+        "Categories": ["Oncology (Q2); Hematology (Q1)", "Law (Q4)", "Law"],
+        "Best_Quartile": pd.array([1, 4, None], dtype="Int8"),
+    })
+    return df if best_quartile else df.drop(columns="Best_Quartile")
+
+def test_journal_dimension_recovers_missing_best_quartile():
+    expected = build_journal_dimension(journals())
+    recovered = build_journal_dimension(journals(best_quartile=False))
+    assert recovered["Best_Quartile"].astype("Int8").tolist() == expected["Best_Quartile"].tolist()
+    assert list(recovered.columns) == list(expected.columns)
+
+def test_journal_categories_recover_missing_quartile():
+    categories = pd.DataFrame({
+        "ISSN": ["01677322", "01677322", "15424863", "1234567X", "99999999"],
+        "Category": ["Oncology", "Hematology", "Law", "Law", "Law"],
+    })
+    built = build_journal_categories(categories, journals(best_quartile=False))
+
+    assert list(built.columns) == ["id", "ISSN", "Category", "Quartile"]
+    assert built["id"].tolist() == [1, 2, 3, 4, 5]
+    assert built["Quartile"].astype(object).where(built["Quartile"].notna(), None).tolist() == [2, 1, 4, None, None]
+
+def test_journal_categories_keep_their_quartile():
+    categories = pd.DataFrame({"ISSN": ["01677322"], "Category": ["Oncology"], "Quartile": pd.array([3], dtype="Int8")})
+    assert build_journal_categories(categories, journals())["Quartile"].tolist() == [3]
+
+def test_publications_without_eid_are_dropped_not_merged():
+    combined = pd.DataFrame({
+        "Author ID": [1, 2, 3, 4, 5],
+        "Author Name": ["A", "B", "C", "D", "E"],
+        "Affiliation ID": [10, 10, 20, 20, 30],
+        "EID": ["2-s2.0-1", "2-s2.0-1", "", None, "2-s2.0-2"],
+        "Title": ["P1", "P1", "P2", "P3", "P4"],
+        "Year": 2021,
+        "Document Type": "Article",
+        "Source title": "J",
+        "DOI": None,
+        "Link": None,
+        "Language of Original Document": "English",
+        "ISSN": None,
+        "PubMed ID": None,
+        "Volume": None,
+        "Issue": None,
+    })
+
+    assert build_fact_table(combined)["Title"].tolist() == ["P1", "P4"]
+    authorships = build_authorship_table(combined)
+    assert list(zip(authorships["EID"], authorships["author_id"])) == [("2-s2.0-1", 1), ("2-s2.0-1", 2), ("2-s2.0-2", 5)]
+
+def cube_counts(level):
+    """Publication cube of P1 (two categories, three authors of two Rabat universities), P2 and P3"""
+    fact_table = pd.DataFrame({
+        "EID": ["P1", "P2", "P3"],
+        "Year": pd.array([2021, 2021, 2022], dtype="Int16"),
+        "Document_Type": pd.Categorical(["Article", "Article", "Review"]),
+        "ISSN": ["X", "Y", None],
+    })
+    authorships = pd.DataFrame({
+        "EID": ["P1", "P1", "P1", "P1", "P2", "P3"],
+        "author_id": [1, 2, 3, 4, 1, 4],
+        "affiliation_id": [10, 11, 30, 20, 10, 20],
+    })
+    affiliations = pd.DataFrame({
+        "id": [10, 11, 30, 20],
+        "University": ["UM5", "UM5", "UIR", "UH2"],
+        "City": ["Rabat", "Rabat", "Rabat", "Casablanca"],
+    })
+    journal_categories = pd.DataFrame({"ISSN": ["X", "X", "Y"], "Category": ["Oncology", "Law", "Law"]})
+
+    cube = build_publication_cube(fact_table, authorships, affiliations, journal_categories, level)
+    return {tuple(row[:4]): tuple(row[4:]) for row in
+            cube[[level, "Year", "Category", "Document_Type", "publications", "authors"]].itertuples(index=False)}
+
+def test_university_cube_counts_distinct_publications():
+    counts = cube_counts("University")
+    assert counts[("UM5", 2021, CUBE_ALL, CUBE_ALL)] == (2, 2)
+    assert counts[("UM5", 2021, "Law", CUBE_ALL)] == (2, 2)
+    assert counts[("UM5", 2021, "Oncology", "Article")] == (1, 2)
+    assert counts[("UM5", 2021, CUBE_ALL, "Article")] == (2, 2)
+    assert counts[("UIR", 2021, CUBE_ALL, CUBE_ALL)] == (1, 1)
+    assert counts[("UH2", 2021, CUBE_ALL, CUBE_ALL)] == (1, 1)
+    assert counts[("UH2", 2022, CUBE_ALL, "Review")] == (1, 1)
+
+def test_city_cube_counts_distinct_publications():
+    counts = cube_counts("City")
+    assert counts[("Rabat", 2021, CUBE_ALL, CUBE_ALL)] == (2, 3)
+    assert counts[("Rabat", 2021, "Law", "Article")] == (2, 3)
+    assert counts[("Rabat", 2021, "Oncology", CUBE_ALL)] == (1, 3)
+    assert counts[("Casablanca", 2021, CUBE_ALL, CUBE_ALL)] == (1, 1)
+    assert counts[("Casablanca", 2022, CUBE_ALL, CUBE_ALL)] == (1, 1)
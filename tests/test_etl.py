@@ -0,0 +1,138 @@
+import json
+import re
+import pandas as pd
+import pytest
+import etl
+from utils import get_project_root
+from etl import (MANIFEST_FILE, RAW_SCOPUS_DIR, get_mappers_state, load_mapping_files, main, plan_files,
+                 read_raw_chunks, transform_data, update_manifest_entry)
+from matchers import CityIndex, build_affiliation_matchers
+from table_io import TableWriter
+from conftest import RAW_FILE
+
+TRANSFORMED_FILE = get_project_root() / "data/transformed/transformed_2021.csv"
+
+@pytest.fixture(scope="module")
+def mappers():
+    cities_mapping, affiliations_by_city, universities_by_city = load_mapping_files()
+    return (
+        CityIndex(cities_mapping),
+        build_affiliation_matchers(affiliations_by_city),
+        build_affiliation_matchers(universities_by_city),
+    )
+
+@pytest.mark.parametrize("chunk_size", [0, 7, 50_000])
+def test_transformed_output_does_not_depend_on_chunk_size(tmp_path, mappers, chunk_size):
+    output_path = tmp_path / "transformed_2021.parquet"
+    with TableWriter(output_path, "transformed", export_csv=True) as writer:
+        for chunk in read_raw_chunks(RAW_FILE, chunk_size):
+            writer.write(transform_data(chunk, *mappers))
+
+    expected = TRANSFORMED_FILE.read_text(encoding="utf-8")
+    assert output_path.with_suffix(".csv").read_text(encoding="utf-8") == expected
+
+def test_raw_text_columns_are_read_as_text(tmp_path):
+    raw_file = tmp_path / "export.csv"
+    pd.DataFrame({
+        "ISSN": ["01677322", None, "1234567X"],
+        "Volume": ["12", "3", None],
+        "Year": [2021, 2022, None],
+    }).to_csv(raw_file, index=False)
+
+    chunks = list(read_raw_chunks(raw_file, chunk_size=1))
+    issns = [chunk["ISSN"].iloc[0] for chunk in chunks]
+    volumes = [chunk["Volume"].iloc[0] for chunk in chunks]
+
+    assert issns[0] == "01677322" and pd.isna(issns[1]) and issns[2] == "1234567X"
+    assert volumes[:2] == ["12", "3"]
+    assert all(str(chunk["Year"].dtype) == "Int64" for chunk in chunks)
+
+def test_raw_export_without_eid_is_rejected(mappers):
+    raw = next(read_raw_chunks(RAW_FILE)).drop(columns="EID")
+    with pytest.raises(ValueError, match="no EID column"):
+        transform_data(raw, *mappers)
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Data directory holding two small raw exports, cut from the demo export"""
+    monkeypatch.setenv("PIPELINE_DATA_DIR", str(tmp_path))
+    scopus_dir = tmp_path / RAW_SCOPUS_DIR
+    scopus_dir.mkdir(parents=True)
+    raw = pd.read_csv(RAW_FILE, dtype=str)
+    raw[:20].to_csv(scopus_dir / "2021.csv", index=False)
+    raw[20:40].to_csv(scopus_dir / "2022.csv", index=False)
+    return tmp_path
+
+def transformed_files(capsys, **options):
+    """Run the ETL and return the reason each file was transformed for, by file name"""
+    capsys.readouterr()
+    main(**options)
+    return dict(re.findall(r"^Transforming (\S+\.csv): (.+)$", capsys.readouterr().out, re.MULTILINE))
+
+def read_manifest(data_dir):
+    with open(data_dir / "transformed" / MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_manifest_decides_which_files_are_transformed(data_dir, capsys, monkeypatch):
+    assert transformed_files(capsys) == {"2021.csv": "new file", "2022.csv": "new file"}
+    manifest = read_manifest(data_dir)
+    assert sorted(manifest["files"]) == ["2021.csv", "2022.csv"]
+    assert manifest["files"]["2021.csv"]["etl_version"] == etl.ETL_VERSION
+
+    # Unchanged raw files, mappers and version: nothing to transform
+    assert transformed_files(capsys) == {}
+    assert read_manifest(data_dir) == manifest
+
+    raw_file = data_dir / RAW_SCOPUS_DIR / "2022.csv"
+    raw_file.write_text(raw_file.read_text(encoding="utf-8").replace("Article", "Review"), encoding="utf-8")
+    assert transformed_files(capsys) == {"2022.csv": "raw content changed"}
+    assert read_manifest(data_dir)["files"]["2022.csv"]["raw_sha256"] != manifest["files"]["2022.csv"]["raw_sha256"]
+    assert read_manifest(data_dir)["files"]["2021.csv"] == manifest["files"]["2021.csv"]
+
+    monkeypatch.setattr(etl, "ETL_VERSION", etl.ETL_VERSION + 1)
+    assert transformed_files(capsys) == {"2021.csv": "ETL version changed", "2022.csv": "ETL version changed"}
+    assert read_manifest(data_dir)["files"]["2021.csv"]["etl_version"] == etl.ETL_VERSION
+    assert transformed_files(capsys) == {}
+
+    assert transformed_files(capsys, force=True) == {"2021.csv": "forced", "2022.csv": "forced"}
+    assert transformed_files(capsys, files=["2021.csv"], force=True) == {"2021.csv": "forced"}
+
+def test_unchanged_files_are_skipped(data_dir, capsys):
+    main()
+    capsys.readouterr()
+    main()
+    out = capsys.readouterr().out
+    assert "Skipping 2021.csv: raw content and mappers unchanged" in out
+    assert "Skipping 2022.csv: raw content and mappers unchanged" in out
+    assert "All transformed files are up to date!" in out
+
+def test_plan_files_reasons(data_dir):
+    csv_files = sorted((data_dir / RAW_SCOPUS_DIR).glob("*.csv"))
+    transformed_dir = data_dir / "transformed"
+    mappers_state = get_mappers_state()
+    main()
+    manifest = read_manifest(data_dir)
+
+    assert plan_files(csv_files, transformed_dir, manifest, mappers_state)[:2] == ([], csv_files)
+
+    changed_mappers = {**mappers_state, "mappers": {**mappers_state["mappers"], etl.MAPPER_FILES[0]: "0" * 64}}
+    to_transform, skipped, _ = plan_files(csv_files, transformed_dir, manifest, changed_mappers)
+    assert [reason for _, reason in to_transform] == ["mappers changed", "mappers changed"] and skipped == []
+
+    next(transformed_dir.glob("transformed_2022.*")).unlink()
+    to_transform, skipped, _ = plan_files(csv_files, transformed_dir, manifest, mappers_state)
+    assert to_transform == [(csv_files[1], "output missing")] and skipped == [csv_files[0]]
+
+def test_update_manifest_entry_sets_and_removes_entries(tmp_path):
+    manifest_path = tmp_path / MANIFEST_FILE
+    update_manifest_entry(manifest_path, "2021.csv", None)
+    assert not manifest_path.exists()
+
+    update_manifest_entry(manifest_path, "2021.csv", {"raw_sha256": "a"})
+    update_manifest_entry(manifest_path, "2022.csv", {"raw_sha256": "b"})
+    update_manifest_entry(manifest_path, "2021.csv", {"raw_sha256": "c"})
+    assert json.loads(manifest_path.read_text(encoding="utf-8")) == {
+        "files": {"2021.csv": {"raw_sha256": "c"}, "2022.csv": {"raw_sha256": "b"}}}
+
+    update_manifest_entry(manifest_path, "2021.csv", None)
+    assert json.loads(manifest_path.read_text(encoding="utf-8")) == {"files": {"2022.csv": {"raw_sha256": "b"}}}
@@ -0,0 +1,123 @@
+import pandas as pd
+import pytest
+from load_to_warehouse import (clean_data, get_conversion_plan, load_publication_years, load_to_warehouse,
+                               split_ranges, upsert_to_warehouse)
+from models.schema import Affiliation, Author, Authorship, Journal, Publication
+
+def test_conversion_plan_follows_column_types():
+    assert get_conversion_plan(Journal) == {
+        "id": "Int64", "Title": "string", "ISSN": "string", "Type": "string", "Rank": "Int64",
+        "SJR": "Float64", "Publisher": "string", "Categories": "string", "Best Quartile": "Int64",
+    }
+    assert get_conversion_plan(Authorship) == {"EID": "string", "Author ID": "Int64", "Affiliation ID": "Int64"}
+    assert get_conversion_plan(Publication)["Year"] == "Int64"
+
+def test_clean_data_casts_columns_and_missing_strings():
+    df = pd.DataFrame({
+        "id": ["1", "2", "nan"],
+        "Title": ["A", "NaN", None],
+        "ISSN": ["01677322", "15424863", "1234567X"],
+        "Rank": [3, None, 1],
+        "SJR": ["1.5", "nan", "0.25"],
+        "Best_Quartile": pd.array([1, None, 4], dtype="Int8"),
+    })
+    cleaned = clean_data(df, Journal)
+
+    assert list(cleaned.columns) == ["id", "Title", "ISSN", "Rank", "SJR", "Best Quartile"]
+    assert cleaned.dtypes.astype(str).to_dict() == {
+        "id": "Int64", "Title": "string", "ISSN": "string", "Rank": "Int64", "SJR": "Float64", "Best Quartile": "Int64",
+    }
+    assert cleaned["ISSN"].tolist() == ["01677322", "15424863", "1234567X"]
+    assert cleaned["Title"].isna().tolist() == [False, True, True]
+    assert cleaned["SJR"].isna().tolist() == [False, True, False]
+    assert cleaned["Rank"].isna().tolist() == [False, True, False]
+    assert cleaned["id"].isna().tolist() == [False, False, True]
+
+def test_clean_data_maps_table_columns_to_column_keys():
+    df = pd.DataFrame({
+        "EID": ["2-s2.0-1"],
+        "author_id": pd.array([57200000000], dtype="Int64"),
+        "affiliation_id": pd.array([91], dtype="Int32"),
+    })
+    cleaned = clean_data(df, Authorship)
+    assert list(cleaned.columns) == ["EID", "Author ID", "Affiliation ID"]
+    assert cleaned.dtypes.astype(str).tolist() == ["string", "Int64", "Int64"]
+
+@pytest.mark.parametrize("rows", [0, 1, 5, 6, 7, 100])
+@pytest.mark.parametrize("count", [0, 1, 3, 6, 200])
+def test_split_ranges_cover_every_row_once(rows, count):
+    df = pd.DataFrame({"EID": [f"2-s2.0-{i}" for i in range(rows)]})
+    ranges = split_ranges(df, count)
+
+    assert len(ranges) <= max(count, 1)
+    assert all(len(rows_range) for rows_range in ranges)
+    assert pd.concat([df.iloc[:0], *ranges])["EID"].tolist() == df["EID"].tolist()
+
+def publications(titles):
+    """Fact rows of three publications, 2020-1, 2021-1 and 2021-2, with the given titles"""
+    return pd.DataFrame({
+        "EID": ["2020-1", "2021-1", "2021-2"],
+        "Title": titles,
+        "Year": pd.array([2020, 2021, 2021], dtype="Int16"),
+    })
+
+def authorships():
+    return pd.DataFrame({
+        "EID": ["2020-1", "2021-1", "2021-2", "2021-2"],
+        "author_id": pd.array([1, 1, 1, 2], dtype="Int64"),
+        "affiliation_id": pd.array([10, 10, 10, 10], dtype="Int32"),
+    })
+
+def query(db, sql):
+    with db.engine.connect() as connection:
+        return [tuple(row) for row in connection.exec_driver_sql(sql)]
+
+def load_states(db):
+    return dict(query(db, "SELECT partition_key, loaded_at FROM load_state"))
+
+def test_upsert_updates_existing_rows_and_inserts_new_ones(warehouse):
+    session = warehouse.Session()
+    try:
+        load_to_warehouse(pd.DataFrame({"ISSN": ["A", "B"], "Title": ["Old A", "Old B"], "SJR": [1.0, 2.0]}),
+                          Journal, session, "postgres")
+        upsert_to_warehouse(pd.DataFrame({"ISSN": ["B", "C", "C"], "Title": ["New B", "New C", "Duplicate C"],
+                                          "SJR": [2.5, 3.0, 4.0]}), Journal, session, "postgres")
+    finally:
+        session.close()
+
+    assert query(warehouse, 'SELECT "ISSN", "Title", "SJR" FROM journals ORDER BY "ISSN"') == [
+        ("A", "Old A", 1.0), ("B", "New B", 2.5), ("C", "New C", 3.0)]
+
+def test_only_changed_years_are_reloaded(warehouse):
+    session = warehouse.Session()
+    try:
+        load_to_warehouse(pd.DataFrame({"id": [10], "Affiliation": ["UM5"]}), Affiliation, session, "postgres")
+        load_to_warehouse(pd.DataFrame({"id": [1, 2], "Name": ["A", "B"], "affiliation_id": [10, 10]}),
+                          Author, session, "postgres")
+    finally:
+        session.close()
+
+    # First load: both years are new
+    assert load_publication_years(publications(["P1", "P2", "P3"]), authorships(), warehouse, "postgres", workers=2) == 7
+    first_states = load_states(warehouse)
+    assert sorted(first_states) == ["2020", "2021"]
+
+    # Same data: nothing is deleted or loaded again
+    assert load_publication_years(publications(["P1", "P2", "P3"]), authorships(), warehouse, "postgres", workers=2) == 0
+    assert load_states(warehouse) == first_states
+
+    # A changed 2021 title: only 2021 is deleted and loaded again
+    assert load_publication_years(publications(["P1", "P2", "P3 revised"]), authorships(), warehouse, "postgres",
+                                  workers=2) == 5
+    states = load_states(warehouse)
+    assert states["2020"] == first_states["2020"] and states["2021"] > first_states["2021"]
+    assert query(warehouse, 'SELECT "EID", "Title" FROM publications ORDER BY "EID"') == [
+        ("2020-1", "P1"), ("2021-1", "P2"), ("2021-2", "P3 revised")]
+    assert query(warehouse, 'SELECT count(*) FROM authorships') == [(4,)]
+
+    # 2020 gone from the data: its rows and load state are deleted
+    remaining = publications(["P1", "P2", "P3 revised"]).iloc[1:]
+    assert load_publication_years(remaining, authorships().iloc[1:], warehouse, "postgres") == 0
+    assert query(warehouse, 'SELECT "EID" FROM publications ORDER BY "EID"') == [("2021-1",), ("2021-2",)]
+    assert query(warehouse, 'SELECT "EID" FROM authorships ORDER BY "EID"') == [("2021-1",), ("2021-2",), ("2021-2",)]
+    assert sorted(load_states(warehouse)) == ["2021"]
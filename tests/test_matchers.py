@@ -0,0 +1,44 @@
+import pytest
+from etl import load_mapping_files
+from matchers import AffiliationMatcher, CityIndex
+from text_normalization import normalize_affiliation
+from legacy_etl import legacy_extract_city_name, legacy_scan_variants
+
+@pytest.fixture(scope="module")
+def mappers():
+    return load_mapping_files()
+
+def test_city_index_matches_linear_scan(mappers, raw_affiliations):
+    cities_mapping = mappers[0]
+    index = CityIndex(cities_mapping)
+    for affiliation in raw_affiliations:
+        assert index.lookup(affiliation.lower()) == legacy_extract_city_name(affiliation, cities_mapping), affiliation
+
+@pytest.mark.parametrize("mapper", [1, 2], ids=["affiliations", "universities"])
+def test_affiliation_matcher_matches_regex_scan(mappers, raw_affiliations, mapper):
+    cities_mapping, variants_by_city = mappers[0], mappers[mapper]
+    matchers = {city: AffiliationMatcher(variants) for city, variants in variants_by_city.items()}
+
+    checked = 0
+    for affiliation in raw_affiliations:
+        city = legacy_extract_city_name(affiliation, cities_mapping)
+        if city not in variants_by_city:
+            continue
+        normalized = normalize_affiliation(affiliation)
+        assert matchers[city].match(normalized) == legacy_scan_variants(variants_by_city[city], normalized), affiliation
+        checked += 1
+    assert checked > 0
+
+def test_affiliation_matcher_prefers_mapper_order_over_position():
+    variants = {"10": ["faculty of science"], "20": ["science", "university"]}
+    matcher = AffiliationMatcher(variants)
+
+    for text in ["university, faculty of science", "science faculty", "faculty of sciences", "nothing here",
+                 "faculty of science and science"]:
+        assert matcher.match(text) == legacy_scan_variants(variants, text), text
+
+def test_affiliation_matcher_sees_overlapping_variants():
+    variants = {"1": ["ecole normale superieure"], "2": ["normale"]}
+    matcher = AffiliationMatcher(variants)
+    text = "ecole ecole normale superieure"
+    assert matcher.match(text) == legacy_scan_variants(variants, text) == ("1", "ecole normale superieure")
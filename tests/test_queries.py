@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import text
+from models import queries
+from models.queries import QueryCache, check_last_load, record_load
+from models.schema import LoadState
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(queries.time, "monotonic", clock)
+    return clock
+
+def test_results_expire_after_ttl(clock):
+    cache = QueryCache(maxsize=4, ttl=10)
+    cache.put("a", 1)
+
+    clock.now = 10
+    assert cache.get("a") == 1
+    clock.now = 10.5
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 0}
+
+def test_least_recently_used_result_is_evicted(clock):
+    cache = QueryCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2}
+
+def test_clear_drops_every_result(clock):
+    cache = QueryCache()
+    cache.put("a", 1)
+    cache.clear()
+    assert cache.get("a") is None
+
+def test_warehouse_without_load_state_has_no_load_recorded(warehouse, clock, monkeypatch):
+    monkeypatch.setattr(queries, "_cache", QueryCache())
+    monkeypatch.setattr(queries, "_last_load", None)
+    monkeypatch.setattr(queries, "_last_load_check", None)
+    with warehouse.engine.begin() as connection:
+        connection.execute(text("DROP TABLE load_state"))
+
+    queries._cache.put("a", 1)
+    check_last_load(warehouse)
+    assert queries._cache.get("a") == 1
+
+    # Once a load is recorded, the next check drops the cached results
+    LoadState.__table__.create(warehouse.engine)
+    session = warehouse.Session()
+    try:
+        record_load(session)
+    finally:
+        session.close()
+    queries._cache.put("a", 1)
+    clock.now = queries.LOAD_CHECK_INTERVAL
+    check_last_load(warehouse)
+    assert queries._cache.get("a") is None
@@ -0,0 +1,79 @@
+import time
+import pytest
+import run_pipeline
+from run_pipeline import critical_path, run_stages
+
+# Stub pipeline: a and b are independent, c needs both, d needs c, e only needs a
+STUB_STAGES = [
+    ("a", "scripts/a.py", "main", []),
+    ("b", "scripts/b.py", "main", []),
+    ("c", "scripts/c.py", "main", ["a", "b"]),
+    ("d", "scripts/d.py", "main", ["c"]),
+    ("e", "scripts/e.py", "main", ["a"]),
+]
+
+@pytest.fixture
+def stub_stages(monkeypatch):
+    """Replace the pipeline stages by stubs, returning the stages that ran
+
+    Stages listed in failing report a failure, the others succeed.
+    """
+    monkeypatch.setattr(run_pipeline, "STAGES", STUB_STAGES)
+    ran = []
+    failing = set()
+
+    def run_stage(stage, script, function, run_id, metrics_dir, profile=False, isolated=False):
+        ran.append(stage)
+        time.sleep(0.01)
+        return {"stage": stage, "script": script, "status": "failed" if stage in failing else "success",
+                "wall_s": 0.01}
+
+    monkeypatch.setattr(run_pipeline, "run_stage", run_stage)
+    return ran, failing
+
+def test_every_stage_runs_after_its_dependencies(stub_stages, tmp_path):
+    ran, _ = stub_stages
+    results = run_stages("test", tmp_path)
+
+    assert list(results) == [stage for stage, *_ in STUB_STAGES]
+    assert sorted(ran) == ["a", "b", "c", "d", "e"]
+    for stage, _, _, depends_on in STUB_STAGES:
+        assert results[stage]["status"] == "success"
+        for dep in depends_on:
+            assert results[stage]["started_s"] >= results[dep]["finished_s"]
+
+def test_stages_depending_on_a_failed_stage_are_skipped(stub_stages, tmp_path):
+    ran, failing = stub_stages
+    failing.add("b")
+    results = run_stages("test", tmp_path)
+
+    assert {stage: result["status"] for stage, result in results.items()} == {
+        "a": "success", "b": "failed", "c": "skipped", "d": "skipped", "e": "success",
+    }
+    assert sorted(ran) == ["a", "b", "e"]
+    assert results["d"] == {"stage": "d", "script": "scripts/d.py", "status": "skipped"}
+
+def test_critical_path_is_the_longest_chain_of_dependencies(monkeypatch):
+    monkeypatch.setattr(run_pipeline, "STAGES", STUB_STAGES)
+    wall_times = {"a": 1.0, "b": 3.0, "c": 2.0, "d": 0.5, "e": 4.0}
+    results = {stage: {"stage": stage, "wall_s": wall_s} for stage, wall_s in wall_times.items()}
+
+    # b > a, so the chain to d goes through b: 3 + 2 + 0.5, longer than a then e
+    assert critical_path(results) == (["b", "c", "d"], 5.5)
+
+    results["e"]["wall_s"] = 5.0
+    assert critical_path(results) == (["a", "e"], 6.0)
+
+def test_critical_path_leaves_out_stages_that_did_not_run(monkeypatch):
+    monkeypatch.setattr(run_pipeline, "STAGES", STUB_STAGES)
+    results = {
+        "a": {"stage": "a", "wall_s": 1.0},
+        "b": {"stage": "b", "wall_s": 3.0},
+        "c": {"stage": "c", "status": "skipped"},
+        "d": {"stage": "d", "status": "skipped"},
+        "e": {"stage": "e", "wall_s": 1.5},
+    }
+    assert critical_path(results) == (["b"], 3.0)
+
+    no_stage_ran = {stage: {"stage": stage, "status": "skipped"} for stage, *_ in STUB_STAGES}
+    assert critical_path(no_stage_ran) == ([], 0.0)
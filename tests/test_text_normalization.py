@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from text_normalization import (normalize_affiliation, normalize_affiliation_series, normalize_digits,
+                                normalize_digits_series, remove_accents, remove_accents_series)
+from legacy_etl import legacy_normalize_digits, legacy_remove_accents
+
+TEXTS = [
+    "Université Mohammed V, Rabat, Morocco",
+    "ecole nationale superieure d'arts et metiers",
+    "Faculté des Sciences Aïn Chock",
+    "université hassan ii, casablanca",
+    "1st faculty, first year, 1er cycle, i, ii, v, 5th, fifth, second, 2nd",
+    "vi iii xv iv",
+    "ﬁnance ﬂow Å ñ ç",
+    "",
+]
+
+@pytest.fixture(scope="module")
+def texts(raw_affiliations):
+    return pd.Series(TEXTS + raw_affiliations, dtype=object)
+
+def test_remove_accents_series_matches_scalar(texts):
+    assert remove_accents_series(texts).tolist() == [remove_accents(text) for text in texts]
+
+def test_normalize_digits_series_matches_scalar(texts):
+    lowered = texts.str.lower()
+    assert normalize_digits_series(lowered).tolist() == [normalize_digits(text) for text in lowered]
+
+def test_normalize_affiliation_series_matches_scalar(texts):
+    assert normalize_affiliation_series(texts).tolist() == [normalize_affiliation(text) for text in texts]
+
+def test_scalar_versions_match_original(texts):
+    for text in texts:
+        assert remove_accents(text) == legacy_remove_accents(text), text
+        assert normalize_digits(text.lower()) == legacy_normalize_digits(text.lower()), text
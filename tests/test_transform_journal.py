@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+from pathlib import Path
+from transform_journal import best_quartile, expand_categories, expand_issn, journal_files, sjr_year, year_number
+
+def iterrows_expand_issn(df):
+    """expand_issn of the original transform_journal"""
+    expanded_rows = []
+    for _, row in df.iterrows():
+        issn_list = [issn.strip() for issn in str(row['Issn']).split(',') if issn.strip()]
+        for issn in issn_list:
+            new_row = row.copy()
+            new_row['Issn'] = issn
+            expanded_rows.append(new_row)
+    return pd.DataFrame(expanded_rows)
+
+def iterrows_expand_categories(df):
+    """expand_categories of the original transform_journal"""
+    categories_rows = []
+    for _, row in df.iterrows():
+        if pd.isna(row['Categories']):
+            continue
+        for category in row['Categories'].split(';'):
+            clean_category = category.split('(')[0].strip()
+            if clean_category:
+                categories_rows.append({'ISSN': row['Issn'], 'Category': clean_category})
+    return pd.DataFrame(categories_rows)
+
+@pytest.fixture
+def journals():
+    return pd.DataFrame({
+        "Rank": [1, 2, 3, 4, 5, 6],
+        "Sourceid": [1000, 1001, 1002, 1003, 1004, 1005],
+        "Title": ["A", "B", "C", "D", "E", "F"],
+        "Issn": ["15424863, 00079235", "-", None, "01677322", "1234567X,", "15424863"],
+        "SJR": [62.937, 1.5, None, 0.25, 3.0, 1.0],
+        "Categories": [
+            "Hematology (Q1); Oncology (Q1)",
+            "Medicine (miscellaneous) (Q3); Law",
+            None,
+            "Law (Q4);  ; Cancer Research (Q2)",
+            "",
+            "Oncology (Q2)",
+        ],
+    })
+
+def to_csv(df):
+    return df.to_csv(index=False, quoting=1)
+
+def test_expand_issn_matches_iterrows(journals):
+    assert to_csv(expand_issn(journals)) == to_csv(iterrows_expand_issn(journals))
+
+def test_expand_categories_matches_iterrows(journals):
+    expanded = expand_issn(journals).drop_duplicates(subset=['Issn'], keep='first')
+    categories = expand_categories(expanded)
+    assert to_csv(categories[['ISSN', 'Category']]) == to_csv(iterrows_expand_categories(expanded))
+
+def test_expand_categories_keeps_quartiles(journals):
+    categories = expand_categories(expand_issn(journals))
+    assert str(categories['Quartile'].dtype) == "Int8"
+    quartiles = dict(zip(zip(categories['ISSN'], categories['Category']), categories['Quartile']))
+    assert quartiles[("00079235", "Hematology")] == 1
+    assert quartiles[("-", "Medicine")] == 3
+    assert pd.isna(quartiles[("-", "Law")])
+
+def test_best_quartile_is_lowest_over_categories(journals):
+    expanded = expand_issn(journals).drop_duplicates(subset=['Issn'], keep='first')
+    best = best_quartile(expanded, expand_categories(expanded))
+    assert dict(zip(expanded['Issn'], best.astype(object).where(best.notna(), None))) == {
+        "15424863": 1, "00079235": 1, "-": 3, "nan": None, "01677322": 2, "1234567X": None,
+    }
+
+def test_sjr_year_rejects_other_file_names():
+    assert sjr_year(Path("data/raw/sjr/journal-23.csv")) == "23"
+    assert sjr_year("journal-2024.csv") == "2024"
+    for name in ["journal.csv", "journal_23.csv", "journal-23 (1).csv", "scimagojr 2023.csv"]:
+        with pytest.raises(ValueError, match="journal-<yy>.csv"):
+            sjr_year(name)
+
+def test_years_sort_by_full_year():
+    names = ["journal-2024.csv", "journal-23.csv", "journal-2022.csv", "journal-25.csv"]
+    assert sorted(names, key=lambda name: year_number(sjr_year(name))) == [
+        "journal-2022.csv", "journal-23.csv", "journal-2024.csv", "journal-25.csv"]
+
+def test_journal_files_pick_latest_complete_year(tmp_path):
+    for name in ["clean_journal_23.csv", "journal_categories_23.csv", "clean_journal_2024.csv",
+                 "journal_categories_2024.csv", "clean_journal_25.csv"]:
+        (tmp_path / name).write_text("")
+
+    assert journal_files(tmp_path) == (tmp_path / "clean_journal_2024.csv", tmp_path / "journal_categories_2024.csv")
+    assert journal_files(tmp_path, "23") == (tmp_path / "clean_journal_23.csv", tmp_path / "journal_categories_23.csv")
+    with pytest.raises(FileNotFoundError):
+        journal_files(tmp_path, "25")
+    with pytest.raises(FileNotFoundError):
+        journal_files(tmp_path / "missing")